@@ -0,0 +1,280 @@
+import threading
+import time
+
+import numpy as np
+
+from database import data_version
+from logs import get_logger
+
+log = get_logger("availability")
+
+# Per-city stock availability of combined_data rows. Cities form a small
+# dictionary (`cities`, id = bit position); every product has two bitmaps
+# over it, the cities its latest crawl checked and the ones where it was out
+# of stock. The crawler replaces both on every stock check.
+#
+# The API answers from an in-memory index rebuilt once per data_version: the
+# same bits transposed into one packed row per city, so "where is X out of
+# stock" reads one product's bits and "what is unavailable in Y (and Z)" is
+# an AND/OR of city rows.
+
+# Delivery locations the crawlers ask about, one representative pincode per city.
+# New cities are appended to the dictionary; existing ids never change.
+CITIES = {
+    "Mumbai": "400001",
+    "Delhi": "110001",
+    "Bengaluru": "560001",
+    "Hyderabad": "500001",
+    "Chennai": "600001",
+    "Kolkata": "700001",
+    "Pune": "411001",
+    "Ahmedabad": "380001",
+    "Jaipur": "302001",
+    "Lucknow": "226001",
+    "Kochi": "682011",
+    "Chandigarh": "160017",
+    "Bhopal": "462001",
+    "Patna": "800001",
+    "Guwahati": "781001",
+    "Bhubaneswar": "751001",
+}
+
+NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+def ensure_availability_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cities (
+            id INTEGER PRIMARY KEY,         -- bit position in availability bitmaps
+            name TEXT NOT NULL UNIQUE,
+            pincode TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_availability (
+            item_rowid INTEGER PRIMARY KEY, -- combined_data.rowid
+            checked BLOB NOT NULL,          -- bitmap: cities with a stock reading
+            out_of_stock BLOB NOT NULL,     -- bitmap: cities where it was out of stock
+            checked_at INTEGER NOT NULL     -- unix seconds of the reading
+        )
+    """)
+    for name, pincode in CITIES.items():
+        cursor.execute(
+            "INSERT OR IGNORE INTO cities SELECT COALESCE(MAX(id) + 1, 0), ?, ? FROM cities",
+            (name, pincode),
+        )
+
+def city_ids(conn):
+    return {row[1]: row[0] for row in conn.execute("SELECT id, name FROM cities")}
+
+# ======================
+# Compressed Bitmaps
+# ======================
+# One tag byte, then whichever body is smaller (as in Roaring's containers):
+#   RAW    little-endian bitmap, trailing zero bytes dropped
+#   SPARSE sorted uint16 ids, for a few set bits among many cities
+RAW, SPARSE = 0, 1
+
+def encode_bitmap(ids):
+    ids = sorted(set(ids))
+    bits = sum(1 << i for i in ids)
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    if ids and ids[-1] < 1 << 16 and 2 * len(ids) < len(raw):
+        return bytes([SPARSE]) + np.array(ids, dtype="<u2").tobytes()
+    return bytes([RAW]) + raw
+
+def decode_bitmap(blob):
+    """Sorted set bit positions."""
+    if not blob:
+        return []
+    if blob[0] == SPARSE:
+        return np.frombuffer(blob, dtype="<u2", offset=1).tolist()
+    bits = int.from_bytes(blob[1:], "little")
+    ids = []
+    while bits:
+        low = bits & -bits
+        ids.append(low.bit_length() - 1)
+        bits ^= low
+    return ids
+
+def stock_statement(source, name, brand, packaging, statuses, ids):
+    """(sql, params) storing one product's reading, {city: True/False/None (unknown)}.
+
+    Runs in the crawler sink's transaction, after the product row itself, so
+    the sync trigger has already given it a combined_data rowid.
+    """
+    checked = [ids[city] for city, in_stock in statuses.items() if in_stock is not None]
+    out = [ids[city] for city, in_stock in statuses.items() if in_stock is False]
+    return f"""
+        INSERT INTO stock_availability (item_rowid, checked, out_of_stock, checked_at)
+        SELECT rowid, ?, ?, {NOW} FROM combined_data
+        WHERE name = ? AND brand IS ? AND source = ? AND COALESCE(packaging, '') = COALESCE(?, '')
+        ON CONFLICT (item_rowid) DO UPDATE SET
+            checked = excluded.checked,
+            out_of_stock = excluded.out_of_stock,
+            checked_at = excluded.checked_at
+    """, (encode_bitmap(checked), encode_bitmap(out), name, brand, source, packaging)
+
+# ======================
+# Query Index
+# ======================
+class AvailabilityIndex:
+    """Stock bits of every checked product, one packed row per city.
+
+    Products are positions in `rowid` (sorted combined_data rowids); bit p of
+    `out[c]` is set when product p was out of stock in city c, of
+    `checked[c]` when city c was checked for it at all.
+    """
+
+    def __init__(self, version, cities, rowid, source, sources, checked_at, checked, out):
+        self.version = version
+        self.cities = cities                            # [(id, name, pincode)] by id
+        self.ids = {name.lower(): i for i, name, _ in cities}
+        self.rowid = rowid
+        self.source, self.sources = source, sources     # codes into `sources`
+        self.checked_at = checked_at
+        self.checked = checked
+        self.out = out
+
+    def position(self, rowid):
+        at = int(np.searchsorted(self.rowid, rowid))
+        return at if at < len(self.rowid) and self.rowid[at] == rowid else None
+
+    def city_names(self, bits, p):
+        byte, mask = p >> 3, 0x80 >> (p & 7)
+        return [name for i, name, _ in self.cities if i < len(bits) and bits[i, byte] & mask]
+
+    def product(self, rowid):
+        """{out_of_stock, in_stock, checked_at} for one row; None when never checked."""
+        p = self.position(rowid)
+        if p is None:
+            return None
+        checked, out = self.city_names(self.checked, p), set(self.city_names(self.out, p))
+        return {
+            "out_of_stock": [c for c in checked if c in out],
+            "in_stock": [c for c in checked if c not in out],
+            "checked_at": int(self.checked_at[p]),
+        }
+
+    def unavailable(self, city_ids, every=True, source=None):
+        """Positions of products out of stock in all (or any) of the given cities."""
+        rows = self.out[city_ids]
+        bits = np.bitwise_and.reduce(rows) if every else np.bitwise_or.reduce(rows)
+        # Unpack only the non-zero bytes: results are sparse next to the catalog
+        at = np.flatnonzero(bits)
+        positions = (at[:, None] * 8 + np.arange(8))[np.unpackbits(bits[at][:, None], axis=1).astype(bool)]
+        if source is not None:
+            positions = positions[self.source[positions] == source]
+        return positions
+
+    def summary(self):
+        """Per city: products checked there and products out of stock there."""
+        return [
+            {
+                "city": name,
+                "pincode": pincode,
+                "checked": int(np.bitwise_count(self.checked[i]).sum()) if i < len(self.checked) else 0,
+                "out_of_stock": int(np.bitwise_count(self.out[i]).sum()) if i < len(self.out) else 0,
+            }
+            for i, name, pincode in self.cities
+        ]
+
+def load_index(conn, version):
+    started = time.perf_counter()
+    cities = [tuple(row) for row in conn.execute("SELECT id, name, pincode FROM cities ORDER BY id")]
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    rows = cursor.execute("""
+        SELECT a.item_rowid, c.source, a.checked_at, a.checked, a.out_of_stock
+        FROM stock_availability a JOIN combined_data c ON c.rowid = a.item_rowid
+        ORDER BY a.item_rowid
+    """).fetchall()
+
+    width = max((i for i, _, _ in cities), default=-1) + 1
+    checked = np.zeros((width, len(rows)), dtype=bool)
+    out = np.zeros((width, len(rows)), dtype=bool)
+    labels = {}
+    source = np.empty(len(rows), dtype=np.int64)
+    for p, (_, label, _, checked_bits, out_bits) in enumerate(rows):
+        source[p] = labels.setdefault(label, len(labels))
+        checked[decode_bitmap(checked_bits), p] = True
+        out[decode_bitmap(out_bits), p] = True
+
+    index = AvailabilityIndex(
+        version, cities,
+        np.array([row[0] for row in rows], dtype=np.int64),
+        source, list(labels),
+        np.array([row[2] for row in rows], dtype=np.int64),
+        np.packbits(checked, axis=1), np.packbits(out, axis=1),
+    )
+    log.info("Indexed stock of %d products over %d cities in %.2fs",
+             len(rows), len(cities), time.perf_counter() - started)
+    return index
+
+_index = None
+_index_lock = threading.Lock()
+
+def availability_index(conn):
+    """The AvailabilityIndex for the current data_version, rebuilt when that changes."""
+    global _index
+    version = data_version(conn)
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = load_index(conn, version)
+            index = _index
+    return index
+
+# ======================
+# Queries
+# ======================
+def product_availability(conn, name, source=None):
+    """Stock by city for every combined_data row called `name` (one per source/brand/pack size)."""
+    index = availability_index(conn)
+    query = "SELECT rowid, name, brand, source, packaging FROM combined_data WHERE name = ?"
+    params = [name]
+    if source:
+        query += " AND source = ?"
+        params.append(source)
+
+    products = []
+    for row in conn.execute(query, params).fetchall():
+        stock = index.product(row["rowid"]) or {"out_of_stock": [], "in_stock": [], "checked_at": None}
+        products.append({"name": row["name"], "brand": row["brand"], "source": row["source"],
+                         "packaging": row["packaging"], **stock})
+    return products
+
+def unavailable_in(conn, cities, every=True, source=None, after=None, limit=100):
+    """Products out of stock in `cities` by rowid -> (items, next cursor). Raises KeyError for an unknown city."""
+    index = availability_index(conn)
+    unknown = [city for city in cities if city.lower() not in index.ids]
+    if unknown:
+        raise KeyError(unknown[0])
+    ids = [index.ids[city.lower()] for city in cities]
+    code = None
+    if source is not None:
+        if source not in index.sources:
+            return [], None
+        code = index.sources.index(source)
+
+    positions = index.unavailable(ids, every, code)
+    if after is not None:
+        positions = positions[index.rowid[positions] > after]
+    picked, rest = positions[:limit], positions[limit:]
+
+    rowids = [int(r) for r in index.rowid[picked]]
+    names = {
+        row["rowid"]: row for row in conn.execute(
+            f"SELECT rowid, name, brand, source FROM combined_data WHERE rowid IN ({','.join('?' * len(rowids))})",
+            rowids,
+        )
+    } if rowids else {}
+    items = [
+        {"name": names[r]["name"], "brand": names[r]["brand"], "source": names[r]["source"],
+         "out_of_stock": index.city_names(index.out, p)}
+        for r, p in zip(rowids, picked) if r in names
+    ]
+    return items, (str(rowids[-1]) if len(rest) else None)
+
+def city_summary(conn):
+    return availability_index(conn).summary()
@@ -0,0 +1,82 @@
+"""Mixed read/write load against one in-process app instance (one event loop,
+like a single uvicorn worker), reporting read and write latency percentiles.
+
+Run from pharmacy_website/app:
+    python bench/async_load.py [--readers 16] [--writers 2] [--seconds 10] [--app DIR]
+
+Works on a scratch copy of crawler/medicines.db (or --db). `--app` points at another
+checkout of pharmacy_website/app to compare against an older revision.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import time
+
+from driver import APP_DIR, BUNDLED_DB, load_app, percentile, scratch_copy
+
+def summary(label, samples, seconds):
+    ms = [s * 1000 for s in samples]
+    return (f"{label:<6} n={len(ms):<6} {len(ms) / seconds:7.1f}/s  "
+            f"p50={percentile(ms, 50):7.2f}ms  p99={percentile(ms, 99):7.2f}ms  max={max(ms, default=0):7.2f}ms")
+
+async def run(app, bulk_body, readers, writers, seconds):
+    import httpx
+
+    read_latency, write_latency = [], []
+    deadline = time.perf_counter() + seconds
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api") as client:
+        async def reader(worker):
+            filters = ("price", "discount")
+            i = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                r = await client.get(f"/create_and_update?filter_by={filters[(worker + i) % 2]}&limit=50")
+                read_latency.append(time.perf_counter() - started)
+                r.raise_for_status()
+                i += 1
+
+        async def writer():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                r = await client.post("/create_and_update?limit=50", json=bulk_body)
+                write_latency.append(time.perf_counter() - started)
+                r.raise_for_status()
+
+        await asyncio.gather(*[reader(i) for i in range(readers)], *[writer() for _ in range(writers)])
+
+    return read_latency, write_latency
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--copies", type=int, default=40, help="bulk body = every product this many times")
+    parser.add_argument("--app", default=APP_DIR)
+    parser.add_argument("--db", default=BUNDLED_DB, help="e.g. a catalog from bench/catalog.py")
+    args = parser.parse_args()
+
+    scratch, db_path = scratch_copy(args.db)
+    app, pool, _ = load_app(args.app, db_path)
+    products = pool.reader().execute("SELECT name, brand FROM combined_data").fetchall()
+    bulk_body = [
+        {"name": p["name"], "brand": p["brand"], "best_price": 10.0 + i, "best_offer": 5.0}
+        for i in range(args.copies) for p in products
+    ]
+
+    try:
+        reads, writes = asyncio.run(run(app, bulk_body, args.readers, args.writers, args.seconds))
+    finally:
+        pool.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"app={os.path.abspath(args.app)}  readers={args.readers} writers={args.writers} "
+          f"bulk={len(bulk_body)} entries  {args.seconds:.0f}s")
+    print(summary("read", reads, args.seconds))
+    print(summary("write", writes, args.seconds))
+
+if __name__ == "__main__":
+    main()
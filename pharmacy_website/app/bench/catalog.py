@@ -0,0 +1,152 @@
+"""Synthetic pharmeasy/apollo catalog for benchmarks.
+
+Run from pharmacy_website/app:
+    python bench/catalog.py --rows 100000 --out /tmp/catalog.db [--overlap 0.6] [--seed 1]
+
+Writes `--rows` products per source table, in the crawlers' unified table
+schema and the string formats they scrape: "₹1,234.50" / "₹91.8*" prices,
+"25% OFF" / "10% off" discounts, "3% CB" cashback and missing discounts.
+`--overlap` is the share of apollo rows that are the same medicine as a
+pharmeasy row, named the way apollo names it ("dolo-650 tablet" vs "dolo 650mg
+strip of 15 tablets").
+Only the source tables are written; the app builds combined_data on startup.
+stock_readings() then adds per-city stock for the started app's rows.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+
+# The unified site table crawler/pipeline.py SiteCrawler.setup() creates: every
+# adapters.base.SOURCE_COLUMNS column, unique on the adapter's key
+COLUMNS = "name TEXT, brand TEXT, packaging TEXT, price TEXT, mrp TEXT, discount TEXT, unit_price TEXT, source TEXT"
+SCHEMAS = {
+    "pharmeasy": f"CREATE TABLE pharmeasy ({COLUMNS}, UNIQUE(name, brand, packaging, source))",
+    "apollo": f"CREATE TABLE apollo ({COLUMNS}, UNIQUE(name, brand, source))",
+}
+
+SYLLABLES = [
+    "do", "lo", "cal", "pol", "cro", "cin", "she", "be", "co", "su", "dex", "or", "ran", "ge",
+    "pan", "to", "zo", "li", "ne", "ro", "bi", "on", "az", "ith", "mox", "cef", "ix", "met",
+    "for", "min", "glu", "tel", "mi", "sar", "ros", "va", "at", "ora", "vi", "ta",
+]
+STRENGTHS = ["5", "10", "20", "25", "40", "50", "100", "150", "200", "250", "300", "400",
+             "500", "625", "650", "750", "1000", "60k", "0.25", "2.5"]
+BRANDS = [
+    "MICRO LABS", "SUN PHARMA", "CIPLA LTD", "TORRENT PHARMACEUTICALS LTD", "MANKIND PHARMACEUTICALS LTD",
+    "ABBOTT", "SANOFI", "GLENMARK", "LUPIN LTD", "ALKEM LABORATORIES LTD", "DR REDDYS", "INTAS",
+    "ZYDUS CADILA", "USV PVT LTD", "FRANCO INDIAN PHARMACEUTICALS PVT LTD", "PROCTER & GAMBLE HEALTH LIMITED",
+]
+# (pharmeasy pack phrase, packaging, apollo suffix, unit)
+FORMS = [
+    ("strip of {n} tablets", "{n} Tablet(s) in Strip", "tablet", "tablet", (10, 15, 20, 30)),
+    ("strip of {n} capsules", "{n} Capsule(s) in Strip", "capsule", "capsule", (10, 15, 20)),
+    ("bottle of {n}ml syrup", "{n}ml Syrup in Bottle", "syrup", "ml", (60, 100, 200)),
+    ("bottle of {n}ml oral suspension", "{n}ml Oral Suspension in Bottle", "oral suspension", "ml", (60, 100)),
+    ("tube of {n}gm gel", "{n}gm Gel in Tube", "gel", "gm", (15, 30, 50)),
+    ("bottle of {n}ml drops", "{n}ml Drops in Bottle", "drops", "ml", (10, 15)),
+]
+
+def rupees(value, commas=True, star=False):
+    text = f"{value:,.2f}" if commas else f"{value:.2f}".rstrip("0").rstrip(".")
+    return f"₹{text}{'*' if star else ''}"
+
+def product(i, rng):
+    """Deterministic unique (stem, strength) for index i, plus random presentation."""
+    s = len(SYLLABLES)
+    stem = SYLLABLES[i % s] + SYLLABLES[(i // s) % s] + SYLLABLES[(i // s ** 2) % s]
+    strength = STRENGTHS[(i // s ** 3) % len(STRENGTHS)]
+    phrase, packaging, suffix, unit, sizes = rng.choice(FORMS)
+    n = rng.choice(sizes)
+    mrp = round(rng.lognormvariate(4.5, 0.9), 2)
+    return {
+        "stem": stem, "strength": strength, "brand": rng.choice(BRANDS), "n": n, "mrp": mrp,
+        "phrase": phrase.format(n=n), "packaging": packaging.format(n=n), "suffix": suffix, "unit": unit,
+    }
+
+def pharmeasy_row(p, rng):
+    pct = rng.choice([25] * 8 + [24, 23, 21, 20, 17, 13, 30, 44])
+    discount = None if rng.random() < 0.05 else f"{pct}% OFF"
+    price = p["mrp"] * (1 - (pct if discount else 0) / 100)
+    strength = p["strength"] if p["strength"].endswith("k") else f"{p['strength']}mg"
+    return (
+        f"{p['stem']} {strength} {p['phrase']}", p["brand"], p["packaging"],
+        rupees(price, star=rng.random() < 0.1),
+        None if rng.random() < 0.3 else rupees(p["mrp"]),
+        discount, f"{rupees(price / p['n'])}/{p['unit']}", "pharmeasy",
+    )
+
+def apollo_row(p, rng):
+    roll = rng.random()
+    if roll < 0.12:
+        discount = f"{rng.choice([3, 3, 5, 15])}% CB"
+        price = p["mrp"]
+    else:
+        pct = rng.choice([10] * 6 + [15, 8, 20, 22, 29, 40])
+        discount = f"{pct}% off"
+        price = p["mrp"] * (1 - pct / 100)
+    name = rng.choice([
+        f"{p['stem']}-{p['strength']} {p['suffix']}",
+        f"{p['stem']} {p['strength']} {p['suffix']}",
+        f"{p['stem']} {p['strength']} mg {p['suffix']}",
+    ])
+    # apollo pages show neither a pack size nor an MRP
+    return (
+        name, p["brand"], None, rupees(price, commas=False, star=rng.random() < 0.1), None,
+        discount, f"{rupees(price / p['n'])}/{p['unit']}", "apollo",
+    )
+
+def generate(path, rows, overlap=0.6, seed=1, batch=10000):
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for ddl in SCHEMAS.values():
+        conn.execute(ddl)
+
+    shared = int(rows * overlap)
+    pharmeasy, apollo = [], []
+    with conn:
+        for i in range(rows):
+            p = product(i, rng)
+            pharmeasy.append(pharmeasy_row(p, rng))
+            # apollo: the first `shared` products are common, the rest are its own
+            apollo.append(apollo_row(p if i < shared else product(rows + i, rng), rng))
+            if len(pharmeasy) >= batch:
+                conn.executemany("INSERT OR IGNORE INTO pharmeasy VALUES (?, ?, ?, ?, ?, ?, ?, ?)", pharmeasy)
+                conn.executemany("INSERT OR IGNORE INTO apollo VALUES (?, ?, ?, ?, ?, ?, ?, ?)", apollo)
+                pharmeasy, apollo = [], []
+        conn.executemany("INSERT OR IGNORE INTO pharmeasy VALUES (?, ?, ?, ?, ?, ?, ?, ?)", pharmeasy)
+        conn.executemany("INSERT OR IGNORE INTO apollo VALUES (?, ?, ?, ?, ?, ?, ?, ?)", apollo)
+    conn.close()
+
+def stock_readings(conn, seed=1, checked=0.8, out_of_stock=0.08):
+    """A crawl's stock check for every combined_data row: each city checked with
+    probability `checked`, and out of stock there with probability `out_of_stock`.
+    """
+    from availability import encode_bitmap     # app module: needs the started app's tables
+
+    rng = random.Random(seed)
+    cities = [row[0] for row in conn.execute("SELECT id FROM cities")]
+    readings = []
+    for (rowid,) in conn.execute("SELECT rowid FROM combined_data").fetchall():
+        seen = [c for c in cities if rng.random() < checked]
+        readings.append((rowid, encode_bitmap(seen), encode_bitmap(c for c in seen if rng.random() < out_of_stock)))
+    conn.executemany(
+        "INSERT OR IGNORE INTO stock_availability VALUES (?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))",
+        readings,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic medicines.db for benchmarks.")
+    parser.add_argument("--rows", type=int, default=10000, help="products per source table")
+    parser.add_argument("--out", default="catalog.db")
+    parser.add_argument("--overlap", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate(args.out, args.rows, args.overlap, args.seed)
+    print(f"[✓] {args.rows} rows per table in {args.out} ({time.perf_counter() - started:.1f}s)")
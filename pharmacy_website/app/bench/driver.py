@@ -0,0 +1,60 @@
+"""Shared pieces of the in-process ASGI benchmarks (async_load.py, routes_bench.py)."""
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED_DB = os.path.join(APP_DIR, "crawler", "medicines.db")
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def scratch_copy(db_path):
+    """Copy a database into a temp dir so benchmarks can write to it. Returns (dir, path)."""
+    scratch = tempfile.mkdtemp(prefix="bench_")
+    path = os.path.join(scratch, "medicines.db")
+    shutil.copy(db_path, path)
+    return scratch, path
+
+def load_app(app_dir, db_path):
+    """Import main.app from `app_dir` against `db_path` and run its startup work.
+
+    httpx's ASGITransport does not send lifespan events, so prepare_combined_data
+    is called here; returns (app, pool, startup seconds).
+    """
+    os.environ["MEDICINES_DB"] = db_path
+    sys.path.insert(0, os.path.abspath(app_dir))
+    os.chdir(app_dir)
+    from combined import prepare_combined_data
+    from database import pool
+    from main import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)     # one INFO line per request
+    started = time.perf_counter()
+    prepare_combined_data()
+    return app, pool, time.perf_counter() - started
+
+async def drive(send, count, concurrency):
+    """Await send(i) for i in range(count) from `concurrency` workers.
+
+    Returns (latencies in seconds, wall-clock seconds).
+    """
+    latencies = []
+    next_index = iter(range(count))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            await send(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, time.perf_counter() - started
@@ -0,0 +1,88 @@
+"""Microbenchmark: normalize.py against the original routes.py parse helpers.
+
+Run from pharmacy_website/app:  python bench/normalize_bench.py [--repeat N]
+Uses every price/discount string in crawler/medicines.db.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import normalize
+from database import DB_PATH
+
+# ======================
+# Original helpers (routes.py before normalize.py), minus the print on failure
+# ======================
+def legacy_parse_price(price_str):
+    if price_str:
+        try:
+            cleaned = str(price_str).strip().replace("₹", "").replace(",", "").replace("*", "")
+            return float(cleaned)
+        except Exception:
+            return None
+    return None
+
+def legacy_parse_discount(discount_str):
+    if discount_str:
+        try:
+            cleaned = str(discount_str).lower().replace("off", "").replace("%", "").replace(" ", "")
+            return float(cleaned)
+        except Exception:
+            return None
+    return 0.0
+
+def legacy_normalize(prices, discounts):
+    out = []
+    for price, discount in zip(prices, discounts):
+        cashback = bool(discount) and "cb" in str(discount).lower()
+        price_value = legacy_parse_price(price)
+        discount_pct = None if cashback else legacy_parse_discount(discount)
+        mrp_value = None
+        if price_value is not None and discount_pct is not None and discount_pct < 100:
+            mrp_value = price_value / (1 - (discount_pct / 100))
+        out.append((price_value, discount_pct, mrp_value, cashback))
+    return out
+
+def uncached_normalize(prices, discounts):
+    offer = normalize.normalize_offer.__wrapped__
+    return [offer(p, d) for p, d in zip(prices, discounts)]
+
+def cached_normalize(prices, discounts):
+    return [normalize.normalize_offer(p, d) for p, d in zip(prices, discounts)]
+
+def load_strings():
+    conn = sqlite3.connect(DB_PATH)
+    rows = []
+    for table in ("pharmeasy", "apollo"):
+        rows += conn.execute(f"SELECT price, discount FROM {table}").fetchall()
+    conn.close()
+    return [r[0] for r in rows], [r[1] for r in rows]
+
+def timed(fn, prices, discounts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(prices, discounts)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(prices)) * 1e9
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    prices, discounts = load_strings()
+
+    # Same answers first
+    expected = legacy_normalize(prices, discounts)
+    assert [tuple(r[:3]) for r in expected] == [tuple(r[:3]) for r in uncached_normalize(prices, discounts)]
+
+    print(f"{len(prices)} price/discount pairs from {DB_PATH}, {args.repeat} passes\n")
+    for label, fn in [
+        ("legacy str.replace helpers", legacy_normalize),
+        ("normalize_offer cache bypassed", uncached_normalize),
+        ("normalize.py, LRU cached", cached_normalize),
+    ]:
+        print(f"{label:32s} {timed(fn, prices, discounts, args.repeat):8.0f} ns/pair")
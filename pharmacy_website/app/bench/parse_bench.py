@@ -0,0 +1,141 @@
+"""Parse benchmark: the old in-thread BeautifulSoup parse against crawler/extract.py.
+
+Run from pharmacy_website/app:
+    python bench/parse_bench.py [--fixtures DIR] [--repeat 200] [--processes 2] [--pad-kb 300]
+
+Fixtures are saved product pages named <site>_<anything>.html, <site> being a
+registered adapter. Real pages carry a few hundred KB of framework markup and
+inline script around the product block; the committed fixtures are trimmed,
+so each is padded back to --pad-kb with markup no selector matches. Exits 1
+if the lxml extractor's record differs from the old parse for any fixture.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import wait
+
+from driver import APP_DIR
+
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(APP_DIR, "crawler"))
+from bs4 import BeautifulSoup
+
+from adapters import ADAPTERS
+from adapters.base import SOURCE_COLUMNS, text
+from extract import Extractor, ParsePool
+from http_fetch import json_ld_fields
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# ======================
+# Old parse (pipeline.SiteCrawler.parse_product before extract.py)
+# ======================
+def legacy_parse(adapter, html):
+    soup = BeautifulSoup(html, "html.parser")
+    record = dict.fromkeys(SOURCE_COLUMNS)
+    record["source"] = adapter.name
+
+    for field, selectors in adapter.fields.items():
+        normalize = adapter.normalizers.get(field, text)
+        for selector in selectors:
+            tag = soup.select_one(selector)
+            if tag is not None:
+                record[field] = normalize(tag.text)
+                break
+
+    if not (record["name"] and record["price"]):
+        blocks = [s.string for s in soup.find_all("script", type="application/ld+json")]
+        ld_name, ld_brand, ld_price = json_ld_fields(blocks)
+        record["name"] = record["name"] or ld_name
+        record["brand"] = record["brand"] or ld_brand
+        record["price"] = record["price"] or ld_price
+    return record
+
+# ======================
+# Fixtures
+# ======================
+def padding(kb):
+    """Site chrome and a hydration payload, roughly `kb` KB of it."""
+    nav = "".join(
+        f'<li class="Nav_item__{i % 97}"><a href="/category/{i}">Category {i}</a>'
+        f'<span class="Nav_badge">{i % 13} offers</span></li>'
+        for i in range(kb * 4)
+    )
+    state = json.dumps({"props": {"items": [{"id": i, "label": f"item {i}"} for i in range(kb * 14)]}})
+    return f'<nav class="Footer_links"><ul>{nav}</ul></nav><script id="__NEXT_DATA__" type="application/json">{state}</script>'
+
+def load_fixtures(directory, pad_kb):
+    pages = []
+    for filename in sorted(os.listdir(directory)):
+        site = filename.split("_", 1)[0]
+        if not filename.endswith(".html") or site not in ADAPTERS:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            html = f.read()
+        if pad_kb:
+            html = html.replace("</body>", padding(pad_kb) + "</body>", 1)
+        pages.append((filename, site, html))
+    return pages
+
+# ======================
+# Runs
+# ======================
+def timed(fn, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for _, site, html in pages:
+            fn(site, html)
+    return time.perf_counter() - started
+
+def pooled(parsers, pages, repeat):
+    started = time.perf_counter()
+    futures = [parsers.submit(site, html) for _ in range(repeat) for _, site, html in pages]
+    wait(futures)
+    for future in futures:
+        future.result()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product-page parsing.")
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory of <site>_*.html pages")
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the fixtures")
+    parser.add_argument("--processes", type=int, default=2, help="ParsePool size")
+    parser.add_argument("--pad-kb", type=int, default=300, help="pad each page to about this size (0: as saved)")
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures, args.pad_kb)
+    if not pages:
+        sys.exit(f"[!] No <site>_*.html fixtures in {args.fixtures}")
+    extractors = {site: Extractor(adapter) for site, adapter in ADAPTERS.items()}
+
+    mismatches = 0
+    for filename, site, html in pages:
+        old, new = legacy_parse(ADAPTERS[site], html), extractors[site](html)
+        if old != new:
+            mismatches += 1
+            print(f"[!] {filename}:\n    old {old}\n    new {new}")
+    size_kb = sum(len(html) for _, _, html in pages) / len(pages) / 1024
+    print(f"{len(pages)} fixtures, {size_kb:.0f} KB average, {mismatches} mismatches")
+
+    count = len(pages) * args.repeat
+    runs = [
+        ("bs4 html.parser", timed(lambda site, html: legacy_parse(ADAPTERS[site], html), pages, args.repeat)),
+        ("lxml extractor", timed(lambda site, html: extractors[site](html), pages, args.repeat)),
+    ]
+    parsers = ParsePool(args.processes)
+    try:
+        pooled(parsers, pages, 1)   # start the processes and build their extractors
+        runs.append((f"ParsePool x{args.processes}", pooled(parsers, pages, args.repeat)))
+    finally:
+        parsers.shutdown()
+
+    baseline = runs[0][1]
+    for label, seconds in runs:
+        print(f"{label:<18} {count / seconds:8.1f} pages/s  {seconds / count * 1000:7.2f} ms/page  x{baseline / seconds:.1f}")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Per-route throughput and latency for every endpoint in routes.py.
+
+Run from pharmacy_website/app:
+    python bench/routes_bench.py [--rows 20000] [--requests 200] [--concurrency 8]
+    python bench/routes_bench.py --record bench/baselines.json      # save a baseline
+    python bench/routes_bench.py --compare bench/baselines.json     # exit 1 on regression
+
+Builds a synthetic catalog (bench/catalog.py) unless --db is given, starts the
+app in-process and drives each route through httpx's ASGI transport. Paged
+GETs walk real cursors, so they are not all cache hits; --no-cache turns the
+response cache off to measure the query and encoding path itself.
+
+Baselines are machine-specific: record them on the machine you compare on.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+
+from catalog import generate, stock_readings
+from driver import APP_DIR, drive, load_app, percentile, scratch_copy
+
+NOISE_MS = 5.0       # latency changes below this are never reported as regressions
+PAGE_WALK = 20       # cursors collected per paged route
+BULK_ENTRIES = 100   # entries per POST /create_and_update (bulk best_price update)
+
+def collect_cursors(client_get, path):
+    """Follow X-Next-Cursor from the first page; returns [None, cursor1, ...]."""
+    cursors, after = [None], None
+    for _ in range(PAGE_WALK - 1):
+        url = path + (f"&after={after}" if after else "")
+        after = client_get(url).headers.get("x-next-cursor")
+        if not after:
+            break
+        cursors.append(after)
+    return cursors
+
+def paged(path, cursors):
+    return lambda i: ("GET", path + (f"&after={cursors[i % len(cursors)]}" if cursors[i % len(cursors)] else ""), None)
+
+def build_scenarios(conn, client_get, rng):
+    """(name, route, requests multiplier, request factory) for each benchmarked call."""
+    products = [dict(row) for row in conn.execute(
+        "SELECT name, brand, source FROM combined_data ORDER BY random() LIMIT 2000"
+    )]
+    names = [p["name"] for p in products]
+    words = [n.split()[0] for n in names]
+    cities = [row["name"] for row in conn.execute("SELECT name FROM cities ORDER BY id")]
+
+    def search_query(i):
+        word = words[i % len(words)]
+        if i % 4 == 3 and len(word) > 4:       # one typo in four
+            j = rng.randrange(1, len(word) - 1)
+            word = word[:j] + word[j + 1:]
+        return ("GET", f"/search?q={word[:max(3, len(word) - i % 3)]}", None)
+
+    def bulk_update(i):
+        body = [
+            {"name": p["name"], "brand": p["brand"], "best_offer": float(5 + (i + j) % 20)}
+            for j, p in enumerate(rng.sample(products, min(BULK_ENTRIES, len(products))))
+        ]
+        return ("POST", "/create_and_update?limit=100", body)
+
+    def reset(i):
+        p = products[i % len(products)]
+        return ("POST", "/reset-entry", {"name": p["name"], "brand": p["brand"]})
+
+    routes = {
+        "pharmeasy page": ("GET /pharmeasy", 1, paged("/pharmeasy?limit=100", collect_cursors(client_get, "/pharmeasy?limit=100"))),
+        "apollo page": ("GET /apollo", 1, paged("/apollo?limit=100", collect_cursors(client_get, "/apollo?limit=100"))),
+    }
+    for filter_by in ("price", "discount"):
+        path = f"/create_and_update?filter_by={filter_by}&limit=100"
+        routes[f"combined by {filter_by}"] = ("GET /create_and_update", 1, paged(path, collect_cursors(client_get, path)))
+    routes.update({
+        "bulk update": ("POST /create_and_update", 0.25, bulk_update),
+        "reset entry": ("POST /reset-entry", 1, reset),
+        "search": ("GET /search", 1, search_query),
+        "matches": ("GET /matches", 0.25, lambda i: ("GET", "/matches?limit=100", None)),
+        "history": ("GET /history", 1, lambda i: ("GET", f"/history?name={names[i % len(names)]}", None)),
+        "availability city": ("GET /availability", 1, lambda i: (
+            "GET", f"/availability?city={cities[i % len(cities)]}&city={cities[(i + 3) % len(cities)]}", None)),
+        "availability product": ("GET /availability", 1, lambda i: ("GET", f"/availability?name={names[i % len(names)]}", None)),
+        "stats": ("GET /stats", 1, lambda i: ("GET", f"/stats?top={5 + i % 20}", None)),
+        "export ndjson": ("GET /combined/export", 0.02, lambda i: ("GET", "/combined/export?format=ndjson", None)),
+    })
+    return routes
+
+def check_coverage(router, scenarios):
+    covered = {route for route, _, _ in scenarios.values()}
+    for route in router.routes:
+        for method in route.methods:
+            if f"{method} {route.path}" not in covered:
+                print(f"[!] No benchmark for {method} {route.path}")
+
+async def run_scenarios(app, scenarios, requests, concurrency):
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api", timeout=None) as client:
+        for name, (route, multiplier, make_request) in scenarios.items():
+            count = max(1, int(requests * multiplier))
+
+            async def send(i):
+                method, url, body = make_request(i)
+                r = await client.request(method, url, json=body)
+                r.raise_for_status()
+                await r.aread()
+
+            latencies, elapsed = await drive(send, count, concurrency)
+            ms = [s * 1000 for s in latencies]
+            results[name] = {
+                "route": route,
+                "requests": count,
+                "rps": round(count / elapsed, 1),
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+            }
+            r = results[name]
+            print(f"{name:<20} {route:<26} n={count:<5} {r['rps']:9.1f}/s  p50={r['p50_ms']:8.2f}ms  p99={r['p99_ms']:8.2f}ms")
+    return results
+
+def compare(results, baseline, tolerance):
+    """Names of scenarios slower than the baseline by more than `tolerance`."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        current = results.get(name)
+        if current is None:
+            continue
+        # Sub-millisecond routes swing by more than `tolerance` on their own
+        slower = (current["p99_ms"] > base["p99_ms"] * (1 + tolerance)
+                  and current["p99_ms"] - base["p99_ms"] > NOISE_MS)
+        fewer = (current["rps"] < base["rps"] * (1 - tolerance)
+                 and current["p50_ms"] - base["p50_ms"] > NOISE_MS)
+        if slower or fewer:
+            regressions.append(name)
+            print(f"[!] {name}: p99 {base['p99_ms']} -> {current['p99_ms']} ms, "
+                  f"{base['rps']} -> {current['rps']} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every API route in-process.")
+    parser.add_argument("--db", help="existing database (default: generate --rows synthetic products)")
+    parser.add_argument("--rows", type=int, default=20000, help="products per source table")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario (scaled per route)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--app", default=APP_DIR)
+    parser.add_argument("--record", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    record = os.path.abspath(args.record) if args.record else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    if args.db:
+        scratch, db_path = scratch_copy(args.db)
+    else:
+        scratch, db_path = scratch_copy(os.devnull)
+        generate(db_path, args.rows)
+
+    app, pool, startup = load_app(args.app, db_path)
+    print(f"startup (combined_data, indexes, matching): {startup:.2f}s")
+    with pool.writer() as conn:
+        stock_readings(conn)
+    if args.no_cache:
+        from cache import response_cache
+        response_cache.max_entries = 0
+
+    from fastapi.testclient import TestClient
+    from routes import router
+
+    try:
+        client = TestClient(app, base_url="http://testserver/api")
+        scenarios = build_scenarios(pool.reader(), client.get, random.Random(1))
+        check_coverage(router, scenarios)
+        results = asyncio.run(run_scenarios(app, scenarios, args.requests, args.concurrency))
+    finally:
+        pool.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    config = {
+        "rows": None if args.db else args.rows, "db": args.db, "requests": args.requests,
+        "concurrency": args.concurrency, "no_cache": args.no_cache,
+        "python": platform.python_version(), "machine": platform.machine(),
+    }
+    if record:
+        with open(record, "w") as f:
+            json.dump({"config": config, "startup_s": round(startup, 2), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"[✓] Baseline written to {record}")
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if {k: baseline["config"].get(k) for k in ("rows", "db", "concurrency", "no_cache")} != \
+                {k: config[k] for k in ("rows", "db", "concurrency", "no_cache")}:
+            print("[!] Baseline was recorded with a different configuration")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+        print("[✓] No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
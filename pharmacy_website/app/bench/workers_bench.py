@@ -0,0 +1,181 @@
+"""Read throughput of serve.py (gunicorn + uvicorn workers) as the worker count grows.
+
+Run from pharmacy_website/app:
+    python bench/workers_bench.py [--workers 1,2,4] [--rows 20000] [--seconds 10] [--clients 4]
+
+Builds a synthetic catalog (bench/catalog.py) unless --db is given, then for
+each worker count starts serve.py on a local port and drives a read mix
+(paged listings, search, history) over real HTTP from --clients load
+processes for --seconds after a warm-up. Reports requests/s, latency and
+scaling against the first worker count: with one worker per free core,
+efficiency should stay near 1.0.
+
+The load processes need CPU too: on a box with fewer cores than workers +
+clients the numbers show contention, not scaling.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+
+import httpx
+
+from catalog import generate
+from driver import APP_DIR, percentile, scratch_copy
+from routes_bench import collect_cursors, paged
+
+READY_TIMEOUT = 120     # seconds for the master's startup work (first run matches the catalog)
+WARMUP = 2.0            # seconds of unmeasured load per run
+CONCURRENCY = 16        # in-flight requests per load process
+
+# ======================
+# Server
+# ======================
+def start_server(workers, port, db_path, snapshot_dir):
+    env = dict(os.environ, MEDICINES_DB=db_path, CATALOG_SNAPSHOT_DIR=snapshot_dir)
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"[!] serve.py exited with {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/pharmeasy?limit=1").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    stop_server(server)
+    sys.exit(f"[!] serve.py not answering after {READY_TIMEOUT}s")
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+# ======================
+# Load
+# ======================
+def read_mix(db_path, base_url):
+    """Read-only request URLs: listing pages at real cursors, searches and history lookups."""
+    conn = sqlite3.connect(db_path)
+    try:
+        names = [row[0] for row in conn.execute("SELECT name FROM combined_data ORDER BY random() LIMIT 500")]
+    finally:
+        conn.close()
+
+    with httpx.Client(base_url=base_url) as client:
+        pages = [
+            paged(path, collect_cursors(client.get, path))
+            for path in ("/pharmeasy?limit=100", "/apollo?limit=100", "/create_and_update?filter_by=price&limit=100")
+        ]
+    urls = [page(i)[1] for i in range(40) for page in pages]
+    urls += [f"/search?q={name.split()[0]}" for name in names[:120]]
+    urls += [f"/history?name={name}" for name in names[120:240]]
+    random.Random(1).shuffle(urls)
+    return urls
+
+async def hammer(base_url, urls, offset, warmup, seconds):
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    measure_from, deadline = start + warmup, start + warmup + seconds
+    next_index = iter(range(offset, 1 << 62))
+
+    async def worker(client):
+        nonlocal errors
+        for i in next_index:
+            sent = time.perf_counter()
+            if sent >= deadline:
+                return
+            try:
+                r = await client.get(urls[i % len(urls)])
+                ok = r.status_code == 200
+            except httpx.TransportError:
+                ok = False
+            done = time.perf_counter()
+            if sent >= measure_from:
+                if ok:
+                    latencies.append(done - sent)
+                else:
+                    errors += 1
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await asyncio.gather(*[worker(client) for _ in range(CONCURRENCY)])
+    return latencies, errors
+
+def load_process(job):
+    return asyncio.run(hammer(*job))
+
+def measure(base_url, urls, clients, seconds):
+    jobs = [(base_url, urls, i * len(urls) // clients, WARMUP, seconds) for i in range(clients)]
+    with multiprocessing.get_context("spawn").Pool(clients) as procs:
+        results = procs.map(load_process, jobs)
+    latencies = [s * 1000 for samples, _ in results for s in samples]
+    return {
+        "rps": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "errors": sum(errors for _, errors in results),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read throughput across serve.py worker counts.")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--db", help="existing database (default: generate --rows synthetic products)")
+    parser.add_argument("--rows", type=int, default=20000, help="products per source table")
+    parser.add_argument("--seconds", type=float, default=10, help="measured seconds per worker count")
+    parser.add_argument("--clients", type=int, default=4, help="load-generating processes")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+    counts = [int(n) for n in args.workers.split(",")]
+
+    cores = os.cpu_count() or 1
+    if cores < max(counts) + args.clients:
+        print(f"[!] {cores} CPU(s) for up to {max(counts)} workers + {args.clients} load processes: "
+              "expect contention, not linear scaling")
+
+    if args.db:
+        scratch, db_path = scratch_copy(args.db)
+    else:
+        scratch, db_path = scratch_copy(os.devnull)
+        generate(db_path, args.rows)
+    snapshot_dir = os.path.join(scratch, "snapshots")    # none published: stats read the database
+    base_url = f"http://127.0.0.1:{args.port}/api"
+
+    rows, urls = [], None
+    try:
+        for workers in counts:
+            server = start_server(workers, args.port, db_path, snapshot_dir)
+            try:
+                if urls is None:
+                    urls = read_mix(db_path, base_url)
+                result = measure(base_url, urls, args.clients, args.seconds)
+            finally:
+                stop_server(server)
+            rows.append((workers, result))
+            print(f"workers={workers:<3} {result['rps']:8.1f} req/s  p50={result['p50_ms']:7.2f}ms  "
+                  f"p99={result['p99_ms']:7.2f}ms  errors={result['errors']}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    base_workers, base = rows[0]
+    print(f"\n{cores} CPU(s), {args.clients} load processes x {CONCURRENCY} connections, {len(urls)} distinct URLs")
+    for workers, result in rows:
+        speedup = result["rps"] / base["rps"] if base["rps"] else float("nan")
+        print(f"workers={workers:<3} speedup x{speedup:.2f}  efficiency {speedup * base_workers / workers:.2f}")
+
+if __name__ == "__main__":
+    main()
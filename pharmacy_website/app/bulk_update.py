@@ -0,0 +1,80 @@
+def clean(value):
+    if value in ("", None):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def valid_entries(body):
+    if isinstance(body, dict):
+        body = [body]
+    if not isinstance(body, list):
+        return []
+    return [e for e in body if isinstance(e, dict) and e.get("name") and e.get("brand")]
+
+
+def load_targets(cursor, keys):
+    """Fetch the normalized price columns for every (name, brand) in one join.
+
+    The keys go into a TEMP table that drives the join (CROSS JOIN fixes the
+    order), so each key is one idx_combined_offer search on its (name, brand)
+    prefix. A row-value IN (VALUES ...) list was not matched against the index
+    and scanned combined_data once per chunk.
+    """
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_keys (name TEXT, brand TEXT)")
+    cursor.execute("DELETE FROM bulk_keys")
+    cursor.executemany("INSERT INTO bulk_keys VALUES (?, ?)", dict.fromkeys(keys))
+    rows = cursor.execute("""
+        SELECT c.name, c.brand, c.price_value, c.mrp_value, c.is_cashback
+        FROM bulk_keys k CROSS JOIN combined_data c ON c.name = k.name AND c.brand = k.brand
+        ORDER BY c.rowid
+    """).fetchall()
+    cursor.execute("DELETE FROM bulk_keys")
+
+    targets = {}
+    for row in rows:
+        # First row wins when a name/brand pair appears under several sources
+        targets.setdefault((row[0], row[1]), row)
+    return targets
+
+
+def derive_updates(entries, targets):
+    """Clean the submitted values and fill in the missing one from the stored MRP."""
+    updates = []
+    for entry in entries:
+        key = (entry["name"], entry["brand"])
+        row = targets.get(key)
+        if row is None or row[2] is None:
+            continue    # unknown product or unparseable price
+
+        mrp, is_cashback = row[3], row[4]
+        best_price = clean(entry.get("best_price"))
+        best_offer = clean(entry.get("best_offer"))
+
+        if not entry.get("force_clear", False) and mrp and not is_cashback:
+            if best_price is not None and best_offer is None:
+                best_offer = round((1 - best_price / mrp) * 100, 2)
+            elif best_offer is not None and best_price is None:
+                best_price = round(mrp * (1 - best_offer / 100), 2)
+
+        updates.append((best_price, best_offer, *key))
+    return updates
+
+
+def apply_updates(conn, body):
+    """Apply a single entry or a list of entries in one transaction. Returns rows written."""
+    entries = valid_entries(body)
+    if not entries:
+        return 0
+
+    cursor = conn.cursor()
+    targets = load_targets(cursor, [(e["name"], e["brand"]) for e in entries])
+    updates = derive_updates(entries, targets)
+    cursor.executemany("""
+        UPDATE combined_data
+        SET best_price = ?, best_offer = ?
+        WHERE name = ? AND brand = ?
+    """, updates)
+    return len(updates)
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Serialized read responses, valid for one data_version (see database.py).
+# Polling clients get 304s off the ETag without the query or JSON encoding.
+
+MAX_ENTRIES = 512
+MAX_BYTES = 64 * 1024 * 1024
+
+class CachedResponse:
+    __slots__ = ("version", "body", "etag", "headers")
+
+    def __init__(self, version, body, headers):
+        self.version = version
+        self.body = body
+        self.etag = f'"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        self.headers = headers or {}
+
+    def matches(self, if_none_match):
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+
+class ResponseCache:
+    """LRU of CachedResponse keyed by endpoint + query, bounded by entry count and bytes."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, headers=None):
+        entry = CachedResponse(version, body, headers)
+        with self._lock:
+            if self._version is None or version > self._version:
+                # Everything cached so far belongs to older data
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+            elif version < self._version:
+                return entry     # built from a snapshot that is already stale
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            if len(body) > self.max_bytes:
+                return entry
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = None
+
+response_cache = ResponseCache()
@@ -0,0 +1,184 @@
+from availability import ensure_availability_tables
+from database import ensure_data_version, pool
+from history import ensure_price_history
+from matching import ensure_match_table, rebuild_matches, store_price_gaps
+from normalize import normalize_offer
+from search import ensure_search_index
+
+# Source tables feeding combined_data and the label stored in its `source` column
+SOURCES = {
+    "pharmeasy": "Pharmeasy",
+    "apollo": "Apollo",
+}
+
+# Normalized numeric columns, filled once when rows land in combined_data
+NUMERIC_COLUMNS = {
+    "price_value": "REAL",
+    "discount_pct": "REAL",
+    "mrp_value": "REAL",
+    "is_cashback": "INTEGER",   # NULL until the row has been normalized
+}
+
+# Unique key of combined_data; NULL packaging (apollo) compares equal to itself
+PRODUCT_KEY = "name, brand, source, COALESCE(packaging, '')"
+
+def ensure_combined_schema(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS combined_data (
+        name TEXT,
+        brand TEXT,
+        price REAL,
+        discount REAL,
+        source TEXT,
+        packaging TEXT,
+        best_price REAL,
+        best_offer REAL,
+        price_value REAL,
+        discount_pct REAL,
+        mrp_value REAL,
+        is_cashback INTEGER,
+        changed_at INTEGER
+    );
+    """)
+
+    # Older databases were created without packaging, the numeric columns and changed_at
+    existing = {col[1] for col in cursor.execute("PRAGMA table_info(combined_data)")}
+    for column, column_type in {"packaging": "TEXT", **NUMERIC_COLUMNS, "changed_at": "INTEGER"}.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE combined_data ADD COLUMN {column} {column_type}")
+
+    # One row per product, pack size and source (pharmeasy lists pack sizes as
+    # separate products); keep the first copy of any duplicates. Replaces the
+    # older key without packaging, which folded pack sizes into one row.
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_combined_offer'").fetchone():
+        cursor.execute("DROP INDEX IF EXISTS idx_combined_product")
+        # Rows stored before packaging was copied over get it from their source
+        # row first, or every pack size would come back as a new row
+        for table in source_tables(cursor):
+            if packaging_value(cursor, table) == "NULL":
+                continue
+            cursor.execute(f"""
+                UPDATE combined_data SET packaging = (
+                    SELECT s.packaging FROM {table} s
+                    WHERE s.name = combined_data.name AND s.brand IS combined_data.brand
+                    ORDER BY s.rowid LIMIT 1
+                )
+                WHERE source = '{SOURCES[table]}' AND packaging IS NULL
+            """)
+        cursor.execute(f"""
+            DELETE FROM combined_data WHERE rowid NOT IN (
+                SELECT MIN(rowid) FROM combined_data GROUP BY {PRODUCT_KEY}
+            )
+        """)
+        cursor.execute(f"CREATE UNIQUE INDEX idx_combined_offer ON combined_data ({PRODUCT_KEY})")
+
+    # Sort keys used by the combined view, plus rows still waiting for normalization
+    cursor.execute("DROP INDEX IF EXISTS idx_combined_price")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_combined_price_key ON combined_data (COALESCE(price_value, 9e999))")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_combined_discount ON combined_data (COALESCE(discount_pct, 0.0) DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_combined_pending ON combined_data (is_cashback) WHERE is_cashback IS NULL")
+
+# Upsert of one source row into combined_data. A changed price or discount
+# clears the numeric columns so the row is normalized again (and lands in
+# price_history, stamped with changed_at); best_price and best_offer are never
+# touched.
+UPSERT_SQL = f"""
+    INSERT INTO combined_data (name, brand, price, discount, packaging, source, changed_at)
+    {{rows}}
+    ON CONFLICT ({PRODUCT_KEY}) DO UPDATE SET
+        price = excluded.price,
+        discount = excluded.discount,
+        changed_at = excluded.changed_at,
+        price_value = NULL,
+        discount_pct = NULL,
+        mrp_value = NULL,
+        is_cashback = NULL
+    WHERE combined_data.price IS NOT excluded.price
+       OR combined_data.discount IS NOT excluded.discount
+"""
+
+def source_tables(cursor):
+    names = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    return [table for table in SOURCES if table in names]
+
+def packaging_value(cursor, table, prefix=""):
+    """Tables without packaging (apollo) contribute NULL."""
+    columns = {col[1] for col in cursor.execute(f"PRAGMA table_info({table})")}
+    return f"{prefix}packaging" if "packaging" in columns else "NULL"
+
+def source_values(cursor, table, prefix=""):
+    """Select-list feeding UPSERT_SQL."""
+    packaging = packaging_value(cursor, table, prefix)
+    return (
+        f"{prefix}name, {prefix}brand, {prefix}price, {prefix}discount, {packaging}, "
+        f"'{SOURCES[table]}', CAST(strftime('%s', 'now') AS INTEGER)"
+    )
+
+def install_sync_triggers(cursor):
+    """Keep combined_data in step with crawler inserts and updates on the source tables."""
+    for table in source_tables(cursor):
+        label = SOURCES[table]
+        upsert = UPSERT_SQL.format(rows=f"VALUES ({source_values(cursor, table, 'NEW.')})")
+        # Recreated every time so trigger bodies follow schema changes
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_sync_insert")
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_sync_update")
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_sync_insert AFTER INSERT ON {table}
+            BEGIN
+                {upsert};
+            END
+        """)
+        # Renames (e.g. crawler/db.py lowercasing names) move the existing row
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_sync_update
+            AFTER UPDATE OF name, brand, price, discount ON {table}
+            BEGIN
+                UPDATE OR IGNORE combined_data SET name = NEW.name, brand = NEW.brand
+                WHERE name = OLD.name AND brand = OLD.brand AND source = '{label}'
+                  AND COALESCE(packaging, '') = COALESCE({packaging_value(cursor, table, 'OLD.')}, '');
+                {upsert};
+            END
+        """)
+
+def sync_combined_data(cursor):
+    """Catch-up pass for rows written while the triggers were missing (e.g. a recreated table)."""
+    for table in source_tables(cursor):
+        cursor.execute(UPSERT_SQL.format(
+            rows=f"SELECT {source_values(cursor, table)} FROM {table} WHERE true"
+        ))
+
+# Runs at ingest (CrawlerSink after_write, in the batch transaction) and as a
+# catch-up at startup; request handlers only read the normalized columns
+def backfill_numeric_columns(cursor):
+    rows = cursor.execute(
+        "SELECT rowid, price, discount FROM combined_data WHERE is_cashback IS NULL"
+    ).fetchall()
+    if not rows:
+        return
+
+    cursor.executemany("""
+        UPDATE combined_data
+        SET price_value = ?, discount_pct = ?, mrp_value = ?, is_cashback = ?
+        WHERE rowid = ?
+    """, [(*normalize_offer(row[1], row[2]), row[0]) for row in rows])
+    # /matches ranks products by the gap between these prices
+    store_price_gaps(cursor, [row[0] for row in rows])
+
+def init_combined_data(cursor):
+    ensure_data_version(cursor)
+    ensure_combined_schema(cursor)
+    ensure_search_index(cursor)
+    ensure_match_table(cursor)
+    ensure_price_history(cursor)
+    ensure_availability_tables(cursor)
+    install_sync_triggers(cursor)
+    sync_combined_data(cursor)
+    backfill_numeric_columns(cursor)
+
+# API startup: all DDL and the catch-up sync run here, not in request handlers
+def prepare_combined_data():
+    with pool.writer() as conn:
+        init_combined_data(conn.cursor())
+        # First run on an existing catalog; afterwards the crawler re-matches
+        if not conn.execute("SELECT 1 FROM product_matches LIMIT 1").fetchone():
+            rebuild_matches(conn)
@@ -0,0 +1,9 @@
+"""Declarative per-site crawl configuration (see base.SiteAdapter).
+
+Adding a pharmacy: write adapters/<site>.py with one SiteAdapter, register it
+below, and add its table to combined.SOURCES so its rows reach the API.
+"""
+from adapters.apollo import APOLLO
+from adapters.pharmeasy import PHARMEASY
+
+ADAPTERS = {adapter.name: adapter for adapter in (PHARMEASY, APOLLO)}
@@ -0,0 +1,27 @@
+from adapters.base import SiteAdapter
+
+# One request to apollopharmacy.in every 2-4 s, shared by every browser worker
+APOLLO = SiteAdapter(
+    name="apollo",
+    search_url="https://www.apollopharmacy.in/search-medicines/{keyword}",
+    link_xpath="//a[contains(@href, '/otc/')]",
+    link_ready_css="a[href*='/otc/']",
+    strip_query=True,
+    page_ready_css="h1.Jf",
+    fields={
+        "name": ["h1.Jf"],
+        "brand": ["div.Xl.Yl"],
+        "price": ['p[class*="rF_"]'],
+        "discount": ['p[class*="tF_"]'],
+        "unit_price": ["span.m.n"],
+    },
+    rate_limit=(2.0, 4.0),
+    user_agents=[
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/112.0",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15",
+    ],
+    pincode_cookie="pincode",
+    out_of_stock_css=['[class*="outOfStock"]', 'button[class*="notifyMe"]'],
+    in_stock_css=['button[class*="addToCart"]'],
+)
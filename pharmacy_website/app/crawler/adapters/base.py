@@ -0,0 +1,86 @@
+# ======================
+# Unified Source Schema
+# ======================
+# Every site table has these columns, whatever the site actually shows;
+# fields a site lacks stay NULL.
+SOURCE_COLUMNS = ["name", "brand", "packaging", "price", "mrp", "discount", "unit_price", "source"]
+
+# Searched on every site unless an adapter brings its own list
+KEYWORDS = [
+    "paracetamol", "dolo 650", "combiflam", "zincovit", "calpol",
+    "crocin", "azithromycin", "cetirizine", "sinarest", "metformin",
+    "atorvastatin", "pantoprazole", "omeprazole", "amoxicillin",
+    "aspirin", "ibuprofen", "diclofenac", "levocetirizine", "nimesulide",
+    "benadryl", "dexorange", "liv 52", "zandu balm", "revital",
+    "shelcal", "becosules", "neurobion forte", "eldecalcitol", "thyronorm",
+    "losartan", "telmisartan", "ramipril", "cilnidipine", "glimepiride",
+    "gliclazide", "pioglitazone", "linagliptin", "sitagliptin", "insulin"
+]
+
+# ======================
+# Field Normalizers
+# ======================
+def text(value):
+    return value.strip() or None
+
+def rupees(value):
+    """' ₹ 90.60 ' -> '₹90.60'"""
+    value = value.strip().replace("₹", "").strip()
+    return f"₹{value}" if value else None
+
+def rupees_per_unit(value):
+    """'₹9.06/tablet' -> '₹9.06/tablet'; anything without a unit is dropped."""
+    value = rupees(value)
+    return value if value and "/" in value else None
+
+def without(*words):
+    """Normalizer removing marketing words, e.g. the 'By' in 'By SUN PHARMA'."""
+    def normalize(value):
+        for word in words:
+            value = value.replace(word, "")
+        return value.strip() or None
+    return normalize
+
+# ======================
+# Site Adapter
+# ======================
+class SiteAdapter:
+    """Everything site-specific about a pharmacy crawl; the pipeline does the rest.
+
+    `fields` maps a SOURCE_COLUMNS name to a list of CSS selectors tried in
+    order; the first match's text goes through `normalizers[field]` (default
+    `text`). `key` is the UNIQUE key of the site table: a re-scraped product
+    with the same key updates the stored row.
+
+    Stock by city: with `pincode_cookie` set, product pages are fetched again
+    once per city with that cookie holding the city's pincode. Any
+    `out_of_stock_css` match means out of stock, then any `in_stock_css`
+    match in stock, otherwise the JSON-LD offer's availability decides.
+    """
+
+    def __init__(
+        self, name, search_url, link_xpath, link_ready_css, page_ready_css, fields,
+        rate_limit, keywords=KEYWORDS, key=("name", "brand", "source"), normalizers=None,
+        link_exclude=(), strip_query=False, max_links=5, user_agents=(),
+        pincode_cookie=None, out_of_stock_css=(), in_stock_css=(),
+    ):
+        unknown = set(fields) - set(SOURCE_COLUMNS)
+        if unknown:
+            raise ValueError(f"{name}: unknown fields {sorted(unknown)}")
+        self.name = name                    # table name, `source` value, frontier site, metrics label
+        self.search_url = search_url        # format string with {keyword}
+        self.link_xpath = link_xpath        # product links on a search results page
+        self.link_ready_css = link_ready_css
+        self.page_ready_css = page_ready_css
+        self.fields = fields
+        self.normalizers = normalizers or {}
+        self.keywords = list(keywords)
+        self.rate_limit = rate_limit        # (min, max) seconds between requests
+        self.key = list(key)
+        self.link_exclude = tuple(link_exclude)
+        self.strip_query = strip_query
+        self.max_links = max_links
+        self.user_agents = list(user_agents)
+        self.pincode_cookie = pincode_cookie  # delivery location; None: no stock checks
+        self.out_of_stock_css = list(out_of_stock_css)
+        self.in_stock_css = list(in_stock_css)
@@ -0,0 +1,30 @@
+from adapters.base import SiteAdapter, rupees, rupees_per_unit, without
+
+# One request to pharmeasy.in every 1.5-3 s, shared by every browser worker
+PHARMEASY = SiteAdapter(
+    name="pharmeasy",
+    search_url="https://pharmeasy.in/search/all?name={keyword}",
+    link_xpath="//a[contains(@href, '/online-medicine-order/')]",
+    link_ready_css="a[href*='/online-medicine-order/']",
+    link_exclude=("/browse",),
+    page_ready_css=".MedicineOverviewSection_medicineName__9K61u",
+    fields={
+        "name": [".MedicineOverviewSection_medicineName__9K61u"],
+        "brand": [".MedicineOverviewSection_brandName__tyUH_"],
+        "packaging": [".MedicineOverviewSection_measurementUnit__rPGh_"],
+        "price": [".PriceInfo_ourPrice__A549p", ".PriceInfo_unitPriceDecimal__i3Shz"],
+        "mrp": [".PriceInfo_striked__fmcJv.PriceInfo_costPrice__jhiax"],
+        "discount": [".PriceInfo_discountContainer__wTilO", ".PriceInfo_gcdDiscountPercent__FvJsG"],
+        "unit_price": [".PriceInfo_originalMrp__TQJRs span", ".PriceInfo_striked__fmcJv"],
+    },
+    normalizers={
+        "brand": without("By"),
+        "price": rupees,
+        "unit_price": rupees_per_unit,
+    },
+    rate_limit=(1.5, 3.0),
+    key=("name", "brand", "packaging", "source"),
+    pincode_cookie="pincode",
+    out_of_stock_css=['[class*="OutOfStock"]', 'button[class*="NotifyMe"]'],
+    in_stock_css=['button[class*="AddToCart"]'],
+)
@@ -0,0 +1,149 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+
+from adapters import ADAPTERS
+from adapters.base import SOURCE_COLUMNS, text
+from http_fetch import json_ld_availability, json_ld_fields
+from metrics import CRAWLER_PARSE_SECONDS
+
+# ======================
+# Compiled Field Extraction
+# ======================
+JSON_LD = etree.XPath('//script[@type="application/ld+json"]')
+
+class Extractor:
+    """One adapter's field selectors, compiled to XPath once and run with lxml.
+
+    Produces the same record as the BeautifulSoup parse it replaces: first
+    matching selector per field, its text through the field's normalizer,
+    then JSON-LD for a missing name or price.
+    """
+
+    def __init__(self, adapter):
+        self.name = adapter.name
+        self.fields = [
+            (field, [CSSSelector(selector) for selector in selectors], adapter.normalizers.get(field, text))
+            for field, selectors in adapter.fields.items()
+        ]
+        # Pages arrive as str; re-encoded so a <meta charset> can't override it
+        self.parser = lxml_html.HTMLParser(encoding="utf-8")
+
+    def __call__(self, html):
+        record = dict.fromkeys(SOURCE_COLUMNS)
+        record["source"] = self.name
+        if not html or not html.strip():
+            return record
+        root = lxml_html.document_fromstring(html.encode("utf-8"), parser=self.parser)
+
+        for field, selectors, normalize in self.fields:
+            for select in selectors:
+                found = select(root)
+                if found:
+                    record[field] = normalize(str(found[0].text_content()))
+                    break
+
+        # Server-rendered JSON-LD fills gaps when the styled markup is missing
+        if not (record["name"] and record["price"]):
+            ld_name, ld_brand, ld_price = json_ld_fields(script.text for script in JSON_LD(root))
+            record["name"] = record["name"] or ld_name
+            record["brand"] = record["brand"] or ld_brand
+            record["price"] = record["price"] or ld_price
+        return record
+
+class StockProbe:
+    """One adapter's stock signals: True (in stock), False (out of stock) or None per page."""
+
+    def __init__(self, adapter):
+        self.out_of_stock = [CSSSelector(selector) for selector in adapter.out_of_stock_css]
+        self.in_stock = [CSSSelector(selector) for selector in adapter.in_stock_css]
+        self.parser = lxml_html.HTMLParser(encoding="utf-8")
+
+    def __call__(self, html):
+        if not html or not html.strip():
+            return None
+        root = lxml_html.document_fromstring(html.encode("utf-8"), parser=self.parser)
+        if any(select(root) for select in self.out_of_stock):
+            return False
+        if any(select(root) for select in self.in_stock):
+            return True
+        return json_ld_availability(script.text for script in JSON_LD(root))
+
+_extractors = {}    # per parser process, built on first use
+_probes = {}
+
+def extract(site, html):
+    """Parser-process task: (record, parse seconds) for one page of a registered site."""
+    extractor = _extractors.get(site)
+    if extractor is None:
+        extractor = _extractors[site] = Extractor(ADAPTERS[site])
+    started = time.perf_counter()
+    record = extractor(html)
+    return record, time.perf_counter() - started
+
+def stock(site, pages):
+    """Parser-process task: {city: True/False/None} from {city: page html or None}."""
+    probe = _probes.get(site)
+    if probe is None:
+        probe = _probes[site] = StockProbe(ADAPTERS[site])
+    return {city: probe(html) for city, html in pages.items()}
+
+# ======================
+# Parser Process Pool
+# ======================
+PARSE_PROCESSES = 2
+PENDING_PER_PROCESS = 4     # pages queued or in parsing per process before fetchers block
+
+class ParsePool:
+    """Extraction stage: raw pages wait in a bounded queue for a pool of parser processes.
+
+    submit() blocks once the queue is full, so fetch workers can't run ahead
+    of the parsers. Shared by every site; parse times land in
+    CRAWLER_PARSE_SECONDS as measured inside the worker.
+    """
+
+    def __init__(self, processes=PARSE_PROCESSES, max_pending=None):
+        # spawn: the crawler forks from a process full of threads otherwise
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._slots = threading.BoundedSemaphore(max_pending or processes * PENDING_PER_PROCESS)
+
+    def submit(self, site, html):
+        """Future of the record parsed from `html`."""
+        def timed(record_and_seconds):
+            record, seconds = record_and_seconds
+            CRAWLER_PARSE_SECONDS.observe(seconds, site=site)
+            return record
+        return self._run(timed, extract, site, html)
+
+    def stock(self, site, pages):
+        """Future of the stock status per city of {city: page html}."""
+        return self._run(None, stock, site, pages)
+
+    def _run(self, finish, fn, *args):
+        self._slots.acquire()
+        result = Future()
+
+        def done(job):
+            self._slots.release()
+            try:
+                value = job.result()
+                result.set_result(finish(value) if finish else value)
+            except Exception as e:
+                result.set_exception(e)
+
+        try:
+            self._executor.submit(fn, *args).add_done_callback(done)
+        except Exception:
+            self._slots.release()
+            raise
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
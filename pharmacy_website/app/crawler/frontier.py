@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+import time
+
+from database import connect
+
+# ======================
+# Persistent Crawl Frontier
+# ======================
+# One row per search or product URL, shared by every crawler in medicines.db.
+# A URL is due when it is new, when its refresh time has passed, or when a
+# failed fetch has waited out its backoff. Unchanged pages are refreshed less
+# and less often; a changed page goes back to the base interval.
+
+SEARCH_REFRESH = 24 * 3600          # re-run keyword searches daily
+PAGE_REFRESH = 6 * 3600             # first re-check of a product page
+MAX_PAGE_REFRESH = 7 * 24 * 3600    # cap for pages that keep coming back unchanged
+RETRY_BACKOFF = 60                  # seconds, doubled per failed attempt
+MAX_RETRIES = 5                     # then the URL is parked as 'dead'
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS crawl_frontier (
+        url TEXT PRIMARY KEY,
+        site TEXT NOT NULL,
+        kind TEXT NOT NULL,                          -- 'search' or 'page'
+        keyword TEXT,
+        state TEXT NOT NULL DEFAULT 'pending',       -- pending, in_progress, done, failed, dead
+        next_fetch INTEGER NOT NULL DEFAULT 0,       -- unix seconds
+        last_fetched INTEGER,
+        content_hash TEXT,
+        refresh_interval INTEGER,
+        retries INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT
+    )
+"""
+
+# Old values on the right-hand side: an unchanged hash doubles the interval
+DONE_SQL = """
+    UPDATE crawl_frontier SET
+        state = 'done',
+        retries = 0,
+        last_error = NULL,
+        last_fetched = :now,
+        refresh_interval = CASE WHEN content_hash IS :hash
+            THEN MIN(COALESCE(refresh_interval, :base) * 2, :max) ELSE :base END,
+        next_fetch = :now + CASE WHEN content_hash IS :hash
+            THEN MIN(COALESCE(refresh_interval, :base) * 2, :max) ELSE :base END,
+        content_hash = :hash
+    WHERE url = :url
+"""
+
+def content_hash(record):
+    """Stable digest of a scraped record's fields."""
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+class FrontierEntry:
+    __slots__ = ("url", "kind", "keyword", "content_hash")
+
+    def __init__(self, url, kind, keyword, content_hash):
+        self.url, self.kind, self.keyword, self.content_hash = url, kind, keyword, content_hash
+
+class Frontier:
+    """Crawl state for one site. Safe to share between that site's threads."""
+
+    def __init__(self, db_path, site):
+        self.site = site
+        self._conn = connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(SCHEMA)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_frontier_due ON crawl_frontier (site, state, next_fetch)"
+            )
+
+    def recover(self):
+        """Requeue URLs claimed by a run that never finished them."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE crawl_frontier SET state = 'pending' WHERE site = ? AND state = 'in_progress'",
+                (self.site,),
+            ).rowcount
+
+    def add(self, urls, kind, keyword=None):
+        """Insert new URLs as pending; known URLs keep their state and schedule."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO crawl_frontier (url, site, kind, keyword) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (url) DO NOTHING",
+                [(url, self.site, kind, keyword) for url in urls],
+            )
+
+    def claim(self, limit):
+        """Mark up to `limit` due URLs in_progress and return them, product pages first."""
+        if limit <= 0:
+            return []
+        with self._lock, self._conn:
+            rows = self._conn.execute("""
+                SELECT url, kind, keyword, content_hash FROM crawl_frontier
+                WHERE site = ? AND state IN ('pending', 'done', 'failed') AND next_fetch <= ?
+                ORDER BY kind = 'search', next_fetch
+                LIMIT ?
+            """, (self.site, int(time.time()), limit)).fetchall()
+            self._conn.executemany(
+                "UPDATE crawl_frontier SET state = 'in_progress' WHERE url = ?",
+                [(row["url"],) for row in rows],
+            )
+        return [FrontierEntry(*row) for row in rows]
+
+    def done_statement(self, url, digest):
+        """(sql, params) marking `url` fetched with content `digest`."""
+        if digest is None:      # searches: fixed schedule
+            base, cap = SEARCH_REFRESH, SEARCH_REFRESH
+        else:
+            base, cap = PAGE_REFRESH, MAX_PAGE_REFRESH
+        return DONE_SQL, {"url": url, "hash": digest, "now": int(time.time()), "base": base, "max": cap}
+
+    def done(self, url, digest=None):
+        sql, params = self.done_statement(url, digest)
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    def failed(self, url, error):
+        """Back off exponentially; park the URL as 'dead' after MAX_RETRIES."""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                UPDATE crawl_frontier SET
+                    retries = retries + 1,
+                    state = CASE WHEN retries + 1 >= ? THEN 'dead' ELSE 'failed' END,
+                    next_fetch = ? + ? * (1 << retries),
+                    last_error = ?
+                WHERE url = ?
+            """, (MAX_RETRIES, int(time.time()), RETRY_BACKOFF, str(error)[:500], url))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,102 @@
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from logs import get_logger
+
+log = get_logger("crawler.http")
+
+# ======================
+# Pooled HTTP Sessions
+# ======================
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+TIMEOUT = (5, 15)   # connect, read (seconds)
+
+_local = threading.local()
+
+def session():
+    """Keep-alive session per worker thread (requests.Session is not thread-safe)."""
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        s.headers.update(HEADERS)
+        _local.session = s
+    return s
+
+def fetch_html(url, cookies=None):
+    try:
+        response = session().get(url, timeout=TIMEOUT, cookies=cookies)
+    except requests.RequestException as e:
+        log.debug("HTTP fetch failed for %s: %s", url, e)
+        return None
+    content_type = response.headers.get("Content-Type", "")
+    if response.status_code != 200 or "html" not in content_type:
+        return None
+    if "charset" not in content_type:
+        response.encoding = "utf-8"     # requests would otherwise assume ISO-8859-1
+    return response.text
+
+# ======================
+# Embedded Product Data
+# ======================
+def json_ld_product(blocks):
+    """First schema.org Product in the page's JSON-LD blocks (their raw text), or None."""
+    for block in blocks:
+        try:
+            data = json.loads(block or "")
+        except ValueError:
+            continue
+        # A block may hold one object, a list, or an object with an @graph;
+        # anything else (scalars, non-object entries) is not a product
+        if isinstance(data, dict):
+            data = data.get("@graph", [data])
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list):
+            continue
+        for item in data:
+            if isinstance(item, dict) and item.get("@type") == "Product":
+                return item
+    return None
+
+def json_ld_fields(blocks):
+    """(name, brand, price) from JSON-LD, each None when absent."""
+    product = json_ld_product(blocks)
+    if not product:
+        return None, None, None
+
+    brand = product.get("brand")
+    if isinstance(brand, dict):
+        brand = brand.get("name")
+
+    offers = product.get("offers") or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    price = offers.get("price") if isinstance(offers, dict) else None
+
+    return product.get("name"), brand, (f"₹{price}" if price not in (None, "") else None)
+
+# schema.org ItemAvailability values, by their last path segment
+AVAILABILITY = {
+    "InStock": True, "LimitedAvailability": True, "OnlineOnly": True, "PreOrder": True,
+    "OutOfStock": False, "SoldOut": False, "Discontinued": False, "InStoreOnly": False,
+}
+
+def json_ld_availability(blocks):
+    """Whether the JSON-LD offer is in stock: True, False, or None when not stated."""
+    product = json_ld_product(blocks)
+    offers = (product or {}).get("offers") or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    availability = offers.get("availability") if isinstance(offers, dict) else None
+    if not isinstance(availability, str):
+        return None
+    return AVAILABILITY.get(availability.rstrip("/").rsplit("/", 1)[-1])
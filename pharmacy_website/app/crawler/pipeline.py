@@ -0,0 +1,168 @@
+import random
+import sqlite3
+from urllib.parse import urljoin
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from adapters.base import SOURCE_COLUMNS
+from availability import CITIES, city_ids, stock_statement
+from combined import SOURCES, backfill_numeric_columns, init_combined_data
+from http_fetch import fetch_html
+from logs import get_logger
+from metrics import CRAWLER_ERRORS, CRAWLER_FETCH_SECONDS
+from scheduler import RateLimiter
+from sink import CrawlerSink
+
+RENDER_TIMEOUT = 10  # seconds to wait for client-side rendering
+DB_PATH = "medicines.db"
+
+# ======================
+# Shared Site Pipeline
+# ======================
+class SiteCrawler:
+    """Runs one SiteAdapter through the shared fetch -> parse -> store pipeline.
+
+    This is the `site` object scheduler.crawl_site drives: it fetches pages,
+    extract.ParsePool parses them, and `sink` stores them. Nothing touches the
+    database or a browser until setup()/make_driver() are called.
+
+    Stock checks are opt-in: each of `cities` (names from availability.CITIES)
+    costs one more fetch per product page, so the default is none. Ignored
+    when the adapter has no pincode_cookie.
+    """
+
+    def __init__(self, adapter, db_path=DB_PATH, cities=()):
+        self.adapter = adapter
+        self.name = adapter.name
+        self.keywords = adapter.keywords
+        self.db_path = db_path
+        self.cities = list(cities) if adapter.pincode_cookie else []
+        self.city_ids = {}
+        self.rate_limit = RateLimiter(*adapter.rate_limit)
+        # Rows reach combined_data through the sync triggers; normalize them in
+        # the same transaction so the API never sees (or has to fill) blanks
+        self.sink = CrawlerSink(db_path, adapter.name, SOURCE_COLUMNS, key=adapter.key,
+                                after_write=backfill_numeric_columns)
+        self.log = get_logger(f"crawler.{adapter.name}")
+
+    def setup(self):
+        """Create or migrate the site table to the unified schema, then hook it into combined_data."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            columns = ", ".join(f"{c} TEXT" for c in SOURCE_COLUMNS)
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.name} (
+                    {columns},
+                    UNIQUE({", ".join(self.adapter.key)})
+                )
+            """)
+            existing = {col[1] for col in cursor.execute(f"PRAGMA table_info({self.name})")}
+            for column in SOURCE_COLUMNS:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {self.name} ADD COLUMN {column} TEXT")
+            # New rows reach combined_data through sync triggers
+            init_combined_data(cursor)
+            conn.commit()
+            self.city_ids = city_ids(conn)
+        finally:
+            conn.close()
+
+    def search_url(self, keyword):
+        return self.adapter.search_url.format(keyword=keyword)
+
+    # ======================
+    # Headless Chrome
+    # ======================
+    def make_driver(self):
+        options = Options()
+        options.add_argument("--headless=new")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        if self.adapter.user_agents:
+            options.add_argument(f"user-agent={random.choice(self.adapter.user_agents)}")
+        return webdriver.Chrome(options=options)
+
+    def load(self, driver, url, css_selector):
+        self.rate_limit.wait()
+        driver.get(url)
+        try:
+            WebDriverWait(driver, RENDER_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
+            )
+        except TimeoutException:
+            pass    # parse whatever rendered
+
+    # ======================
+    # Fetch
+    # ======================
+    def fetch_page(self, driver, url):
+        """Plain HTTP fetch; None when the page has to be rendered instead.
+
+        Takes the worker's (lazy) driver like every browser task, but never
+        starts the browser.
+        """
+        self.rate_limit.wait()
+        with CRAWLER_FETCH_SECONDS.time(site=self.name, method="http"):
+            return fetch_html(url)
+
+    def render(self, driver, url):
+        with CRAWLER_FETCH_SECONDS.time(site=self.name, method="browser"):
+            self.load(driver, url, self.adapter.page_ready_css)
+            return driver.page_source
+
+    def fetch_stock(self, driver, url):
+        """{city: page html or None}, the product page as delivered to each city's pincode."""
+        pages = {}
+        for city in self.cities:
+            self.rate_limit.wait()
+            with CRAWLER_FETCH_SECONDS.time(site=self.name, method="stock"):
+                pages[city] = fetch_html(url, cookies={self.adapter.pincode_cookie: CITIES[city]})
+        return pages
+
+    def stock_statement(self, record, statuses):
+        """Sink statement storing `statuses` ({city: in stock?}) for the row `record` lands in."""
+        return stock_statement(SOURCES[self.name], record["name"], record["brand"], record["packaging"],
+                               statuses, self.city_ids)
+
+    @staticmethod
+    def complete(record):
+        """Whether a parsed plain-HTTP page is good enough to skip the browser."""
+        return bool(record["name"] and record["price"])
+
+    # ======================
+    # Search
+    # ======================
+    def find_product_links(self, driver, keyword):
+        adapter = self.adapter
+        self.load(driver, self.search_url(keyword), adapter.link_ready_css)
+
+        product_links = []
+        seen = set()
+        try:
+            for card in driver.find_elements(By.XPATH, adapter.link_xpath):
+                href = card.get_attribute("href")
+                if not href or any(part in href for part in adapter.link_exclude):
+                    continue
+                url = urljoin(driver.current_url, href)
+                if adapter.strip_query:
+                    url = url.split("?")[0]
+                if url not in seen:
+                    product_links.append(url)
+                    seen.add(url)
+                if len(product_links) >= adapter.max_links:
+                    break
+        except Exception as e:
+            CRAWLER_ERRORS.inc(site=self.name, stage="search")
+            self.log.warning("Error finding product links for %s: %s", keyword, e)
+
+        self.log.info("Found %d results for '%s'", len(product_links), keyword)
+        for link in product_links:
+            self.log.debug("- %s", link)
+        return product_links
+
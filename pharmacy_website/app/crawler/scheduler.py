@@ -0,0 +1,243 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Shared data-layer modules live one level up, next to the API
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frontier import Frontier, content_hash
+from logs import SampledLogger, get_logger, setup_logging
+from metrics import CRAWLER_ERRORS, CRAWLER_PAGES, serve_metrics
+
+log = get_logger("crawler.scheduler")
+
+# ======================
+# Per-Domain Rate Limiting
+# ======================
+class RateLimiter:
+    """Spaces requests to one domain by a random interval, shared by all its workers."""
+
+    def __init__(self, min_interval, max_interval=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval or min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + random.uniform(self.min_interval, self.max_interval)
+        if slot > now:
+            time.sleep(slot - now)
+
+# ======================
+# Browser Worker Pool
+# ======================
+class LazyDriver:
+    """Stands in for a WebDriver and only launches the browser on first use."""
+
+    def __init__(self, make_driver):
+        self._make_driver = make_driver
+        self.driver = None
+
+    def __getattr__(self, attr):
+        if self.driver is None:
+            self.driver = self._make_driver()
+        return getattr(self.driver, attr)
+
+    def quit(self):
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+
+class BrowserWorkers:
+    """Thread pool where every worker thread keeps its own (lazily started) browser."""
+
+    def __init__(self, make_driver, workers):
+        self.make_driver = make_driver
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            driver = LazyDriver(self.make_driver)
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def submit(self, fn, *args):
+        return self._executor.submit(lambda: fn(self._driver(), *args))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        for driver in self._drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                log.warning("Error closing browser: %s", e)
+        self._drivers.clear()
+
+# ======================
+# Site Crawl
+# ======================
+IN_FLIGHT_PER_WORKER = 2    # claimed-but-unfinished URLs per browser
+scraped_log = SampledLogger(log, every=10)     # one line per 10 pages
+
+def crawl_site(site, workers, parsers):
+    """Crawl every due search and product URL of one site across `workers` browsers.
+
+    `site` is a pipeline.SiteCrawler (or anything with its name, keywords,
+    sink, cities, setup(), search_url(), make_driver(), find_product_links(),
+    fetch_page(), render(), complete(), fetch_stock() and stock_statement()).
+    What is due comes from the persistent frontier, so an interrupted crawl
+    resumes where it stopped.
+
+    A product page moves through stages, each a future in one wait() loop:
+    plain HTTP fetch (worker thread) -> parse (`parsers`, an extract.ParsePool)
+    -> store, with a browser render and second parse when the plain page has
+    no name or price. With `site.cities`, the parsed record waits while the
+    page is fetched once per city (stock) and those pages are parsed for
+    stock status (stock_parse), then both are stored together. Workers go
+    back to fetching while the parsers run.
+    """
+    site.setup()
+    name = site.name
+    frontier = Frontier(site.sink.db_path, name)
+    requeued = frontier.recover()
+    if requeued:
+        log.info("%s: resuming %d interrupted URLs", name, requeued)
+    for keyword in site.keywords:
+        frontier.add([site.search_url(keyword)], "search", keyword)
+
+    pool = BrowserWorkers(site.make_driver, workers)
+    outstanding = {}    # future -> (FrontierEntry, stage)
+    records = {}        # url -> parsed record waiting for its stock check
+    window = workers * IN_FLIGHT_PER_WORKER
+
+    def submit_due():
+        for entry in frontier.claim(window - len(outstanding)):
+            if entry.kind == "search":
+                outstanding[pool.submit(site.find_product_links, entry.keyword)] = (entry, "search")
+            else:
+                outstanding[pool.submit(site.fetch_page, entry.url)] = (entry, "fetch")
+
+    def store(entry, record, stock=None):
+        scraped_log.info("%s: scraped %s", name, record["name"])
+        # Stock is part of the digest: a product going out of stock is a change
+        digest = content_hash(record if stock is None else {**record, "stock": stock})
+        if digest == entry.content_hash:
+            CRAWLER_PAGES.inc(site=name, outcome="unchanged")
+            frontier.done(entry.url, digest)
+            return
+        # Marked done in the same transaction that writes the row
+        CRAWLER_PAGES.inc(site=name, outcome="changed")
+        also = [frontier.done_statement(entry.url, digest)]
+        if record["name"] and any(in_stock is not None for in_stock in (stock or {}).values()):
+            also.append(site.stock_statement(record, stock))
+        site.sink.add(record, also=also)
+
+    try:
+        submit_due()
+        while outstanding:
+            done, _ = wait(outstanding, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry, stage = outstanding.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    records.pop(entry.url, None)
+                    CRAWLER_ERRORS.inc(site=name, stage=stage)
+                    if entry.kind == "page":
+                        CRAWLER_PAGES.inc(site=name, outcome="error")
+                    log.warning("%s stage for %s failed: %s", stage, entry.url, e)
+                    frontier.failed(entry.url, e)
+                    continue
+
+                if stage == "search":
+                    frontier.add(result, "page", entry.keyword)
+                    frontier.done(entry.url)
+                elif stage == "fetch" and result:
+                    outstanding[parsers.submit(name, result)] = (entry, "parse")
+                elif stage == "fetch" or (stage == "parse" and not site.complete(result)):
+                    outstanding[pool.submit(site.render, entry.url)] = (entry, "render")
+                elif stage == "render":
+                    outstanding[parsers.submit(name, result)] = (entry, "parse_rendered")
+                elif stage == "stock":
+                    outstanding[parsers.stock(name, result)] = (entry, "stock_parse")
+                elif stage == "stock_parse":
+                    store(entry, records.pop(entry.url), result)
+                elif site.cities:
+                    records[entry.url] = result
+                    outstanding[pool.submit(site.fetch_stock, entry.url)] = (entry, "stock")
+                else:
+                    store(entry, result)
+            submit_due()
+    finally:
+        pool.shutdown()
+        site.sink.flush()
+        frontier.close()
+
+def crawl_all(sites, workers, parsers):
+    """Crawl every site at the same time, each with its own browser pool and rate limit."""
+    threads = [
+        threading.Thread(target=crawl_site, args=(site, workers, parsers), name=site.name)
+        for site in sites
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def publish_catalog(db_path="medicines.db"):
+    """After a crawl: re-link products across sources once all new rows are in,
+    then ship the result to API workers as a catalog snapshot."""
+    from database import connect
+    from matching import rebuild_matches
+    from snapshot import publish_snapshot
+
+    conn = connect(db_path)
+    try:
+        rebuild_matches(conn)
+        publish_snapshot(conn)
+    finally:
+        conn.close()
+
+# ======================
+# Run Scheduler
+# ======================
+if __name__ == "__main__":
+    from adapters import ADAPTERS
+    from availability import CITIES
+    from extract import PARSE_PROCESSES, ParsePool
+    from pipeline import SiteCrawler
+
+    parser = argparse.ArgumentParser(description="Crawl pharmacy sites concurrently.")
+    parser.add_argument("--workers", type=int, default=2, help="browsers per site")
+    parser.add_argument("--sites", nargs="+", choices=list(ADAPTERS), default=list(ADAPTERS))
+    parser.add_argument("--parsers", type=int, default=PARSE_PROCESSES, help="HTML parser processes, shared by all sites")
+    parser.add_argument("--cities", nargs="*", choices=list(CITIES), default=[],
+                        help="cities to check stock in, one extra fetch per product and city (default: none)")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+    setup_logging()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    SITES = {name: SiteCrawler(adapter, cities=args.cities) for name, adapter in ADAPTERS.items()}
+    parsers = ParsePool(args.parsers)
+    try:
+        crawl_all([SITES[name] for name in args.sites], args.workers, parsers)
+    finally:
+        parsers.shutdown()
+        for site in SITES.values():
+            site.sink.close()
+
+    publish_catalog()
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from database import bump_data_version, connect, ensure_data_version
+from logs import get_logger
+from metrics import CRAWLER_ERRORS, CRAWLER_ROWS_WRITTEN
+
+log = get_logger("crawler.sink")
+
+# ======================
+# Buffered Crawler Writes
+# ======================
+def insert_sql(table, columns, key=None):
+    rows = f"{table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"
+    if not key:
+        return f"INSERT OR IGNORE INTO {rows}"
+    values = [c for c in columns if c not in key]
+    return (
+        f"INSERT INTO {rows} ON CONFLICT ({', '.join(key)}) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in values)
+        + " WHERE " + " OR ".join(f"{table}.{c} IS NOT excluded.{c}" for c in values)
+    )
+
+class CrawlerSink:
+    """Buffers scraped records and writes them with one executemany per transaction.
+
+    A flush happens once `batch_size` records are waiting, when the oldest
+    buffered record is `flush_interval` seconds old, or on flush()/close().
+    With `key` (the table's UNIQUE columns) a re-scraped record overwrites the
+    stored one, but only when one of its other columns actually changed.
+    add(record, also=[(sql, params), ...]) runs those statements in the same
+    transaction as the record, e.g. to mark its frontier URL done only once
+    the row is on disk. `after_write(cursor)`, if given, runs last in every
+    batch transaction.
+    """
+
+    def __init__(self, db_path, table, columns, batch_size=50, flush_interval=5.0, key=None, after_write=None):
+        self.db_path = db_path
+        self.table = table
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._sql = insert_sql(table, self.columns, key)
+        self._after_write = after_write
+        self._buffer = []
+        self._also = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._timer.start()
+
+    def add(self, record, also=()):
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append({c: record.get(c) for c in self.columns})
+            self._also.extend(also)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        if self._conn is None:
+            self._conn = connect(self.db_path, check_same_thread=False)
+            with self._conn:
+                ensure_data_version(self._conn)
+        batch, self._buffer = self._buffer, []
+        also, self._also = self._also, []
+        try:
+            with self._conn:     # one transaction per batch
+                self._conn.executemany(self._sql, batch)
+                for sql, params in also:
+                    self._conn.execute(sql, params)
+                if self._after_write is not None:
+                    self._after_write(self._conn.cursor())
+                bump_data_version(self._conn)     # invalidates the API response cache
+        except Exception as e:
+            log.warning("Failed to write %d %s rows: %s", len(batch), self.table, e)
+            CRAWLER_ERRORS.inc(site=self.table, stage="write")
+            self._buffer = batch + self._buffer     # retried on the next flush
+            self._also = also + self._also
+            return
+        CRAWLER_ROWS_WRITTEN.inc(len(batch), table=self.table)
+        log.debug("Saved %d %s rows", len(batch), self.table)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(min(self.flush_interval, 1.0)):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._oldest >= self.flush_interval:
+                    self._flush_locked()
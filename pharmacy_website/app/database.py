@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Set DB path (MEDICINES_DB overrides the bundled crawler database)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("MEDICINES_DB", os.path.join(BASE_DIR, "crawler", "medicines.db"))
+
+# Applied to every connection. WAL lets readers keep going while a writer commits.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",        # ~16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",      # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Prepared statements kept per connection by the sqlite3 module
+STATEMENT_CACHE_SIZE = 256
+
+
+def connect(path=None, check_same_thread=True):
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        check_same_thread=check_same_thread,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# Single-row counter bumped by every write the response cache depends on
+# (crawler sink batches, best_price edits). Readers compare it, not the data.
+def ensure_data_version(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO data_version VALUES (0, 0)")
+
+def bump_data_version(conn):
+    conn.execute("UPDATE data_version SET version = version + 1")
+
+def data_version(conn):
+    row = conn.execute("SELECT version FROM data_version").fetchone()
+    return row[0] if row else 0
+
+
+class ConnectionPool:
+    """Per-thread read connections plus one serialized writer connection.
+
+    Under serve.py every worker process has its own pool. Writer transactions
+    start with BEGIN IMMEDIATE, taking SQLite's write lock up front, so writers
+    in different workers queue on busy_timeout instead of failing with
+    SQLITE_BUSY halfway through; readers never block on them (WAL).
+
+    Async handlers must not touch sqlite3 on the event loop: they queue writes
+    with `await pool.write(fn, ...)`, which runs on a dedicated writer thread,
+    and offload reads to the threadpool like sync routes.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DB_PATH
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.RLock()     # held for a whole writer transaction
+        self._write_queue = None
+        self._queue_lock = threading.Lock()     # only guards creating _write_queue
+
+    def reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = connect(self.path, check_same_thread=False)
+            try:
+                self._writer.execute("BEGIN IMMEDIATE")
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    async def write(self, fn, *args):
+        """Run fn(conn, *args) in one writer transaction, off the event loop.
+
+        Never takes _write_lock here: another thread may hold it for a whole
+        transaction, and waiting for it would stall the loop.
+        """
+        with self._queue_lock:
+            if self._write_queue is None:
+                self._write_queue = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+            queue = self._write_queue
+        return await asyncio.get_running_loop().run_in_executor(queue, self._run_write, fn, args)
+
+    def _run_write(self, fn, args):
+        with self.writer() as conn:
+            return fn(conn, *args)
+
+    def close(self):
+        with self._queue_lock:
+            queue, self._write_queue = self._write_queue, None
+        if queue is not None:
+            queue.shutdown(wait=True)   # let queued writes commit first
+        with self._readers_lock:
+            for conn in self._readers:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass    # created in another thread, dropped with it
+            self._readers.clear()
+        self._local = threading.local()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+pool = ConnectionPool()
@@ -1,7 +1,19 @@
-fetch('/api/apollo')
-  .then(res => res.json())
-  .then(data => populateTable(data))
-  .catch(err => console.error("Error:", err));
+let nextCursor = null;
+
+function loadPage() {
+  const url = nextCursor ? `/api/apollo?after=${encodeURIComponent(nextCursor)}` : '/api/apollo';
+  fetch(url)
+    .then(res => {
+      nextCursor = res.headers.get("X-Next-Cursor");
+      document.getElementById("load-more-btn").style.display = nextCursor ? "" : "none";
+      return res.json();
+    })
+    .then(data => populateTable(data))
+    .catch(err => console.error("Error:", err));
+}
+
+document.getElementById("load-more-btn").addEventListener("click", loadPage);
+loadPage();
 
 function populateTable(data) {
   const head = document.getElementById("table-head");
@@ -10,11 +22,13 @@ function populateTable(data) {
   if (!data.length) return;
 
   const headers = Object.keys(data[0]);
-  headers.forEach(key => {
-    const th = document.createElement("th");
-    th.textContent = key;
-    head.appendChild(th);
-  });
+  if (!head.children.length) {
+    headers.forEach(key => {
+      const th = document.createElement("th");
+      th.textContent = key;
+      head.appendChild(th);
+    });
+  }
 
   data.forEach(row => {
     const tr = document.createElement("tr");
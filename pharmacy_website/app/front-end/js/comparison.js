@@ -8,8 +8,20 @@ document.addEventListener("DOMContentLoaded", () => {
   filterSelect.addEventListener("change", () => {
     loadData(filterSelect.value);
   });
+
+  document.getElementById("load-more-btn").addEventListener("click", () => {
+    loadMore(filterSelect.value);
+  });
 });
 
+let nextCursor = null;
+
+function readPage(res) {
+  nextCursor = res.headers.get("X-Next-Cursor");
+  document.getElementById("load-more-btn").style.display = nextCursor ? "" : "none";
+  return res.json();
+}
+
 function buildTable(data) {
   const thead = document.getElementById("table-head");
   const tbody = document.getElementById("table-body");
@@ -82,15 +94,22 @@ function loadData(filter) {
   fetch(`/api/create_and_update?filter_by=${filter}`, {
     method: 'POST'
   })
-    .then(res => res.json())
+    .then(readPage)
     .then(data => {
-      console.log("Fetched data:", data);
       clearTable();
       buildTable(data);
     })
     .catch(err => console.error("Error:", err));
 }
 
+function loadMore(filter) {
+  if (!nextCursor) return;
+  fetch(`/api/create_and_update?filter_by=${filter}&after=${encodeURIComponent(nextCursor)}`)
+    .then(readPage)
+    .then(data => buildTable(data))
+    .catch(err => console.error("Error:", err));
+}
+
 function clearTable() {
   document.getElementById("table-head").innerHTML = "";
   document.getElementById("table-body").innerHTML = "";
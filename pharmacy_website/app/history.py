@@ -0,0 +1,106 @@
+import math
+import time
+
+# Append-only price history for combined_data rows. A point is written only
+# when a row's normalized price or discount differs from its latest point, so
+# re-crawling an unchanged catalog adds nothing. Points are clustered by
+# (item, ts), so one product's series is a single index range scan.
+
+NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+DEFAULT_POINTS = 200
+
+def ensure_price_history(cursor):
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='price_history'"
+    ).fetchone()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS price_history (
+            item_rowid INTEGER NOT NULL,    -- combined_data.rowid
+            ts INTEGER NOT NULL,            -- unix seconds the crawler saw the change
+            price_value REAL,
+            discount_pct REAL,
+            PRIMARY KEY (item_rowid, ts)
+        ) WITHOUT ROWID
+    """)
+    if not exists:
+        # Seed with the current state of every normalized row
+        cursor.execute(f"""
+            INSERT INTO price_history
+            SELECT rowid, COALESCE(changed_at, {NOW}), price_value, discount_pct
+            FROM combined_data WHERE is_cashback IS NOT NULL
+        """)
+
+    # backfill_numeric_columns sets is_cashback once a new or changed row is normalized
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS price_history_record
+        AFTER UPDATE OF is_cashback ON combined_data
+        WHEN NEW.is_cashback IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM (
+                SELECT price_value, discount_pct FROM price_history
+                WHERE item_rowid = NEW.rowid ORDER BY ts DESC LIMIT 1
+            ) AS latest
+            WHERE latest.price_value IS NEW.price_value AND latest.discount_pct IS NEW.discount_pct
+        )
+        BEGIN
+            INSERT OR REPLACE INTO price_history
+            VALUES (NEW.rowid, COALESCE(NEW.changed_at, {NOW}), NEW.price_value, NEW.discount_pct);
+        END
+    """)
+
+def downsample(conn, item_rowid, since=None, until=None, points=DEFAULT_POINTS):
+    """At most `points` buckets over [since, until]: closing price/discount plus low/high per bucket.
+
+    The last change before `since` is included as the first point so step
+    charts start at the right level.
+    """
+    until = int(until if until is not None else time.time())
+    if since is None:
+        first = conn.execute(
+            "SELECT MIN(ts) FROM price_history WHERE item_rowid = ?", (item_rowid,)
+        ).fetchone()[0]
+        since = first if first is not None else until
+    since = int(since)
+    width = max(1, math.ceil((until - since + 1) / points))
+
+    series = []
+    before = conn.execute("""
+        SELECT ts, price_value, discount_pct FROM price_history
+        WHERE item_rowid = ? AND ts < ? ORDER BY ts DESC LIMIT 1
+    """, (item_rowid, since)).fetchone()
+    if before:
+        series.append({"ts": before["ts"], "price": before["price_value"], "discount": before["discount_pct"],
+                       "low": before["price_value"], "high": before["price_value"]})
+
+    rows = conn.execute("""
+        SELECT ts, price_value, discount_pct, low, high FROM (
+            SELECT ts, price_value, discount_pct,
+                   MIN(price_value) OVER bucket AS low,
+                   MAX(price_value) OVER bucket AS high,
+                   ROW_NUMBER() OVER (bucket ORDER BY ts DESC) AS position
+            FROM price_history
+            WHERE item_rowid = ? AND ts BETWEEN ? AND ?
+            WINDOW bucket AS (PARTITION BY (ts - ?) / ?)
+        )
+        WHERE position = 1
+        ORDER BY ts
+    """, (item_rowid, since, until, since, width)).fetchall()
+    series += [
+        {"ts": row["ts"], "price": row["price_value"], "discount": row["discount_pct"],
+         "low": row["low"], "high": row["high"]}
+        for row in rows
+    ]
+    return series
+
+def fetch_history(conn, name, source=None, since=None, until=None, points=DEFAULT_POINTS):
+    """Downsampled series for every combined_data row called `name` (one per source/brand/pack size)."""
+    query = "SELECT rowid, name, brand, source, packaging FROM combined_data WHERE name = ?"
+    params = [name]
+    if source:
+        query += " AND source = ?"
+        params.append(source)
+
+    return [
+        {"name": row["name"], "brand": row["brand"], "source": row["source"], "packaging": row["packaging"],
+         "points": downsample(conn, row["rowid"], since, until, points)}
+        for row in conn.execute(query, params).fetchall()
+    ]
@@ -0,0 +1,32 @@
+import itertools
+import logging
+import os
+
+# Level from LOG_LEVEL (default INFO). Per-item messages on hot paths go
+# through SampledLogger so a crawl doesn't spend its time writing to stdout.
+
+FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+def setup_logging():
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format=FORMAT)
+
+def get_logger(name):
+    return logging.getLogger(f"pharmacy.{name}")
+
+class SampledLogger:
+    """Emits one call in `every` (the first, then every Nth); the rest are dropped unformatted."""
+
+    def __init__(self, logger, every):
+        self.logger = logger
+        self.every = every
+        self._calls = itertools.count()
+
+    def log(self, level, msg, *args):
+        if next(self._calls) % self.every == 0 and self.logger.isEnabledFor(level):
+            self.logger.log(level, f"{msg} [1/{self.every} sampled]", *args)
+
+    def debug(self, msg, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(logging.INFO, msg, *args)
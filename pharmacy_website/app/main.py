@@ -1,9 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import router  # assuming routes.py is in same directory
+from database import pool
+from combined import prepare_combined_data
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
+from logs import setup_logging
+from metrics import CONTENT_TYPE, RequestTimer, render
+from snapshot import snapshots
 import os
     
+setup_logging()
+
 app = FastAPI(
     title="Pharmacy Price Comparison API",
     description="Compare product prices between PharmEasy, Apollo, and your own offers.",
@@ -17,17 +25,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # keyset pagination cursor
 )
 
-# Include API routes
-app.include_router(router)
+# Per-route latency histograms, served on /metrics below
+app.add_middleware(RequestTimer)
+
+# Create combined_data, its indexes and sync triggers before serving requests.
+# serve.py does this once in the gunicorn master and sets app.state.prepared,
+# so forked workers skip it.
+app.state.prepared = False
+
+def prepare():
+    if not app.state.prepared:
+        prepare_combined_data()
+        app.state.prepared = True
+
+app.add_event_handler("startup", prepare)
+
+# Map the published catalog snapshot, if any; later versions are swapped in as they appear
+app.add_event_handler("startup", snapshots.current)
+
+# Release pooled SQLite connections on shutdown
+app.add_event_handler("shutdown", pool.close)
+
+# API routes, once, under /api (the front-end calls /api/...)
+app.include_router(router, prefix="/api")
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Pharmacy Comparison API"}
 
-#front-end acces
-app.include_router(router, prefix="/api")
+# Prometheus scrape endpoint (must be registered before the "/" static mount)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render(), media_type=CONTENT_TYPE)
+
 # Get absolute path to /app/front-end
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIR = os.path.join(BASE_DIR, "front-end")
@@ -0,0 +1,240 @@
+import re
+import time
+from collections import defaultdict
+
+from database import bump_data_version, connect, ensure_data_version
+from logs import get_logger, setup_logging
+
+log = get_logger("matching")
+
+# Offline stage that links the same medicine across sources. Rows are grouped
+# by a cheap blocking key (first word of the name + strength) and only pairs
+# inside a block from different sources are scored, so the cost grows with
+# block sizes rather than with the square of the catalog.
+
+MATCH_THRESHOLD = 0.6
+PACK_MISMATCH_PENALTY = 0.8     # same product, different pack size: still a match, lower confidence
+MAX_BLOCK_SIZE = 500            # oversized blocks (very generic names) are skipped
+GAP_REFRESH_ALL = 1000          # more changed rows than this: recompute every product's gap
+
+PACK_PATTERNS = [
+    re.compile(r"\b(?:strip|bottle|box|tube|pack|sachet|packet|jar|vial|cartridge)s? of (\d+(?:\.\d+)?)\s*([a-z]*)"),
+    re.compile(r"\b(\d+)\s*'s\b"),
+    re.compile(r",\s*(\d+(?:\.\d+)?)\s*(tablets?|capsules?|ml|gm|g)\b"),
+    re.compile(r"\b(\d+(?:\.\d+)?)\s*(ml|gm)\b"),
+]
+STRENGTH = re.compile(r"(\d+(?:\.\d+)?(?:/\d+(?:\.\d+)?)*)\s*(mg|mcg|iu|k|%|g)?\b")
+WORD = re.compile(r"[a-z][a-z0-9+]*|\d+(?:\.\d+)?")
+
+# Dosage forms and packaging words carry no identity
+STOPWORDS = {
+    "tablet", "tablets", "tab", "tabs", "capsule", "capsules", "cap", "caps", "softgel",
+    "strip", "strips", "of", "bottle", "box", "tube", "pack", "sachet", "packet", "jar",
+    "syrup", "suspension", "drops", "drop", "oral", "liquid", "gel", "cream", "granules",
+    "mg", "mcg", "ml", "gm", "g", "iu", "s", "for", "with", "and", "the", "in",
+}
+
+# Dosage-form families; two rows with different known forms never match
+FORMS = {
+    "tablet": "tablet", "tablets": "tablet", "tab": "tablet", "tabs": "tablet",
+    "capsule": "capsule", "capsules": "capsule", "cap": "capsule", "caps": "capsule", "softgel": "capsule",
+    "syrup": "liquid", "suspension": "liquid", "liquid": "liquid",
+    "drops": "drops", "drop": "drops",
+    "gel": "topical", "cream": "topical", "balm": "topical",
+    "granules": "powder", "powder": "powder",
+}
+
+def pack_size(name):
+    for pattern in PACK_PATTERNS:
+        match = pattern.search(name)
+        if match:
+            return match.group(1)
+    return None
+
+def normalize_name(name):
+    """(core words, strength, pack size, dosage form) for a raw product name."""
+    text = (name or "").lower().replace("-", " ").replace("_", " ")
+    pack = pack_size(text)
+    # Read the form before pack phrases ("bottle of 30 capsules") are stripped
+    form = next((FORMS[w] for w in WORD.findall(text) if w in FORMS), None)
+    for pattern in PACK_PATTERNS:
+        text = pattern.sub(" ", text)
+
+    strength_match = STRENGTH.search(text)
+    strength = strength_match.group(1) if strength_match else None
+    if strength_match and strength_match.group(2) == "k":
+        strength = str(int(float(strength) * 1000))     # "60k" == "60000iu"
+
+    words = [w for w in WORD.findall(text) if w not in STOPWORDS and not w[0].isdigit()]
+    return words, strength, pack, form
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)} or {text}
+
+def score(a, b):
+    """Blend of word Jaccard and character-trigram Dice on the core name, 0..1."""
+    words_a, words_b = set(a["words"]), set(b["words"])
+    if not words_a or not words_b:
+        return 0.0
+    if a["form"] and b["form"] and a["form"] != b["form"]:
+        return 0.0
+    jaccard = len(words_a & words_b) / len(words_a | words_b)
+    grams_a, grams_b = a["grams"], b["grams"]
+    dice = 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+    result = 0.5 * jaccard + 0.5 * dice
+    if a["pack"] and b["pack"] and a["pack"] != b["pack"]:
+        result *= PACK_MISMATCH_PENALTY
+    return result
+
+def prepare(rows):
+    items = []
+    for rowid, name, source in rows:
+        words, strength, pack, form = normalize_name(name)
+        if not words:
+            continue
+        items.append({
+            "rowid": rowid, "source": source, "words": words, "pack": pack, "form": form,
+            "grams": trigrams(" ".join(words)),
+            "block": f"{words[0]}|{strength or ''}",
+        })
+    return items
+
+def match_items(items):
+    """Greedy grouping: strongest pairs first, at most one row per source in a product."""
+    blocks = defaultdict(list)
+    for item in items:
+        blocks[item["block"]].append(item)
+
+    edges = []
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if a["source"] == b["source"]:
+                    continue
+                s = score(a, b)
+                if s >= MATCH_THRESHOLD:
+                    edges.append((s, a["rowid"], b["rowid"]))
+
+    group = {item["rowid"]: item["rowid"] for item in items}
+    members = {item["rowid"]: [item["rowid"]] for item in items}
+    sources = {item["rowid"]: {item["source"]} for item in items}
+    confidence = {}
+    for s, a, b in sorted(edges, reverse=True):
+        ga, gb = group[a], group[b]
+        if ga == gb or sources[ga] & sources[gb]:
+            continue
+        keep, merged = min(ga, gb), max(ga, gb)
+        for rowid in members[merged]:
+            group[rowid] = keep
+        members[keep] += members.pop(merged)
+        sources[keep] |= sources.pop(merged)
+        # A product is only as certain as its weakest link
+        confidence[keep] = min(s, confidence.pop(keep, 1.0), confidence.pop(merged, 1.0))
+
+    blocks_by_rowid = {item["rowid"]: item["block"] for item in items}
+    return [
+        (rowid, product_id, confidence.get(product_id), blocks_by_rowid[rowid])
+        for rowid, product_id in group.items()
+    ]
+
+def ensure_match_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_matches (
+            item_rowid INTEGER PRIMARY KEY,    -- combined_data.rowid
+            product_id INTEGER NOT NULL,       -- smallest item_rowid in the group
+            confidence REAL,                   -- NULL for unmatched items
+            block_key TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_product ON product_matches (product_id)")
+    # One row per matched product, ranked for /matches without reading the matches
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_gaps (
+            product_id INTEGER PRIMARY KEY,    -- product_matches.product_id
+            confidence REAL NOT NULL,
+            price_gap REAL                     -- NULL with fewer than two known prices
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_gaps_rank ON product_gaps (COALESCE(price_gap, 0) DESC, product_id)")
+
+def store_price_gaps(cursor, rowids=None):
+    """Recompute product_gaps for the products containing `rowids` (default: all).
+
+    Runs after matching and whenever backfill_numeric_columns re-normalizes
+    prices, inside the caller's transaction.
+    """
+    gaps = """
+        SELECT m.product_id, MIN(m.confidence),
+               CASE WHEN COUNT(c.price_value) > 1 THEN ROUND(MAX(c.price_value) - MIN(c.price_value), 2) END
+        FROM product_matches m JOIN combined_data c ON c.rowid = m.item_rowid
+        WHERE m.confidence IS NOT NULL {where}
+        GROUP BY m.product_id
+    """
+    if rowids is None or len(rowids) > GAP_REFRESH_ALL:
+        cursor.execute("DELETE FROM product_gaps")
+        cursor.execute("INSERT INTO product_gaps " + gaps.format(where=""))
+        return
+    cursor.executemany(
+        "INSERT OR REPLACE INTO product_gaps " + gaps.format(
+            where="AND m.product_id = (SELECT product_id FROM product_matches WHERE item_rowid = ?)"),
+        [(rowid,) for rowid in rowids],
+    )
+
+def rebuild_matches(conn):
+    """Re-match the whole catalog and replace product_matches in one transaction."""
+    started = time.perf_counter()
+    rows = conn.execute("SELECT rowid, name, source FROM combined_data").fetchall()
+    matches = match_items(prepare(rows))
+
+    with conn:
+        cursor = conn.cursor()
+        ensure_match_table(cursor)
+        cursor.execute("DELETE FROM product_matches")
+        cursor.executemany("INSERT INTO product_matches VALUES (?, ?, ?, ?)", matches)
+        store_price_gaps(cursor)
+        # Cached price-gap statistics (stats.py) depend on the matches
+        ensure_data_version(cursor)
+        bump_data_version(conn)
+
+    linked = sum(1 for m in matches if m[2] is not None)
+    log.info("Matched %d of %d rows in %.2fs", linked, len(matches), time.perf_counter() - started)
+    return matches
+
+def fetch_matched_products(conn, limit=100, min_confidence=MATCH_THRESHOLD):
+    """Cross-source products with their per-source prices, largest price gap first."""
+    products = {
+        row["product_id"]: {
+            "product_id": row["product_id"], "confidence": round(row["confidence"], 3), "items": [],
+            "price_gap": row["price_gap"],
+        }
+        for row in conn.execute("""
+            SELECT product_id, confidence, price_gap FROM product_gaps
+            WHERE confidence >= ?
+            ORDER BY COALESCE(price_gap, 0) DESC, product_id
+            LIMIT ?
+        """, (min_confidence, limit))
+    }
+    if not products:
+        return []
+
+    rows = conn.execute(f"""
+        SELECT m.product_id, c.name, c.brand, c.source, c.price, c.price_value
+        FROM product_matches m JOIN combined_data c ON c.rowid = m.item_rowid
+        WHERE m.product_id IN ({','.join('?' * len(products))})
+        ORDER BY m.item_rowid
+    """, list(products)).fetchall()
+    for row in rows:
+        products[row["product_id"]]["items"].append(
+            {k: row[k] for k in ("name", "brand", "source", "price", "price_value")}
+        )
+    return list(products.values())
+
+if __name__ == "__main__":
+    setup_logging()
+    conn = connect()
+    try:
+        rebuild_matches(conn)
+    finally:
+        conn.close()
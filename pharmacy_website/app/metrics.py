@@ -0,0 +1,152 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal in-process metrics in the Prometheus text format. The API serves them
+# on /metrics (main.py); crawler processes expose their own with serve_metrics().
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+def label_text(names, values, extra=""):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{label_text(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}     # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{label_text(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{label_text(self.labels, key)} {cumulative}")
+        return lines
+
+def render():
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+def serve_metrics(port):
+    """Expose render() on http://0.0.0.0:<port>/metrics from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
+
+# ======================
+# API
+# ======================
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency by route", ("method", "route", "status"))
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Time spent in SQLite per query kind", ("query",))
+DB_ROWS = Counter(
+    "db_rows_returned_total", "Rows returned to API callers per query kind", ("query",))
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Response cache lookups (hit, miss, not_modified)", ("result",))
+
+class RequestTimer:
+    """ASGI middleware: observes HTTP_REQUEST_SECONDS labelled with the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def record_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record_status)
+        finally:
+            # The router stores the matched route in scope; static files have none
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=status)
+
+# ======================
+# Crawlers
+# ======================
+CRAWLER_PAGES = Counter(
+    "crawler_pages_total", "Product pages scraped", ("site", "outcome"))
+CRAWLER_FETCH_SECONDS = Histogram(
+    "crawler_fetch_duration_seconds", "Page fetch time (plain HTTP or browser)", ("site", "method"))
+CRAWLER_PARSE_SECONDS = Histogram(
+    "crawler_parse_duration_seconds", "HTML parse time per page", ("site",))
+CRAWLER_ERRORS = Counter(
+    "crawler_errors_total", "Crawler failures by stage", ("site", "stage"))
+CRAWLER_ROWS_WRITTEN = Counter(
+    "crawler_rows_written_total", "Rows flushed by the crawler sinks", ("table",))
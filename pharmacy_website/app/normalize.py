@@ -0,0 +1,46 @@
+import re
+from functools import lru_cache
+
+# Characters dropped before float(): "₹1,234.50*" -> "1234.50"
+PRICE_NOISE = re.compile(r"[₹,*]")
+# Dropped from lowercased discounts: "12% OFF" -> "12"
+DISCOUNT_NOISE = re.compile(r"off|%| ")
+
+CACHE_SIZE = 65536
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_price(price_str):
+    """'₹1,234.50*' -> 1234.5; None when empty or unparseable."""
+    if not price_str:
+        return None
+    try:
+        return float(PRICE_NOISE.sub("", str(price_str)))
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_discount(discount_str):
+    """'12% off' -> 12.0; 0.0 when empty, None when unparseable (e.g. cashback)."""
+    if not discount_str:
+        return 0.0
+    try:
+        return float(DISCOUNT_NOISE.sub("", str(discount_str).lower()))
+    except ValueError:
+        return None
+
+def is_cashback(discount_str):
+    return bool(discount_str) and "cb" in str(discount_str).lower()
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_offer(price, discount):
+    """(price_value, discount_pct, mrp_value, is_cashback) for one scraped price/discount pair."""
+    cashback = 1 if is_cashback(discount) else 0
+    price_value = parse_price(price)
+    # Cashback offers are not a discount on MRP
+    discount_pct = None if cashback else parse_discount(discount)
+
+    mrp_value = None
+    if price_value is not None and discount_pct is not None and discount_pct < 100:
+        mrp_value = price_value / (1 - (discount_pct / 100))
+
+    return price_value, discount_pct, mrp_value, cashback
@@ -1,84 +1,314 @@
-from fastapi import APIRouter, Query, Request
-from fastapi.responses import JSONResponse
-import sqlite3
-import os
-import traceback    #to track error
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import csv
+import io
+import json
+from database import bump_data_version, connect, data_version, pool
+from cache import response_cache
+from logs import get_logger
+from metrics import CACHE_REQUESTS, DB_QUERY_SECONDS, DB_ROWS
+from bulk_update import apply_updates
+from search import search
+from history import DEFAULT_POINTS, fetch_history
+from matching import MATCH_THRESHOLD, fetch_matched_products
+from availability import city_summary, product_availability, unavailable_in
+from stats import DEFAULT_BRANDS, DEFAULT_TOP, MIN_BRAND_ROWS, catalog_stats, stats_source
 router = APIRouter()
+log = get_logger("routes")
+
+# Pagination defaults
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def parse_fields(fields, allowed):
+    if not fields:
+        return list(allowed)
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def parse_cursor(after):
+    # Cursor is "<sort_key>,<rowid>", or just "<rowid>" for unsorted tables
+    try:
+        key, _, rowid = after.rpartition(",")
+        return (float(key) if key else None), int(rowid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
+
+def fetch_page(conn, table, fields, after=None, limit=DEFAULT_PAGE_SIZE, sort_key=None, descending=False):
+    """Keyset pagination over `table` ordered by (sort_key, rowid)."""
+    key_expr = sort_key or "rowid"
+    where, params = "", []
+
+    if after:
+        key, rowid = parse_cursor(after)
+        if sort_key is None:
+            where, params = "WHERE rowid > ?", [rowid]
+        else:
+            op = "<" if descending else ">"
+            where = f"WHERE {key_expr} {op}= ? AND ({key_expr} {op} ? OR rowid > ?)"
+            params = [key, key, rowid]
+
+    direction = "DESC" if descending else "ASC"
+    columns = ", ".join(fields)
+    with DB_QUERY_SECONDS.time(query=f"page:{table}"):
+        rows = conn.execute(f"""
+            SELECT {columns}, {key_expr} AS _sort_key, rowid AS _rowid
+            FROM {table}
+            {where}
+            ORDER BY {key_expr} {direction}, rowid
+            LIMIT ?
+        """, params + [limit + 1]).fetchall()
+    DB_ROWS.inc(min(len(rows), limit), query=f"page:{table}")
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = f"{last['_rowid']}" if sort_key is None else f"{last['_sort_key']!r},{last['_rowid']}"
+
+    return [{f: row[f] for f in fields} for row in rows], next_cursor
+
+def page_response(items, next_cursor, status_code=200):
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONResponse(content=items, status_code=status_code, headers=headers)
+
+def cached_page(request, key, build):
+    """Serve build() -> (items, next_cursor) from response_cache while the data version holds."""
+    version = data_version(pool.reader())
+    entry = response_cache.get(key, version)
+    result = "hit"
+    if entry is None:
+        items, next_cursor = build()
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        entry = response_cache.put(key, version, JSONResponse(content=items).body, headers)
+        result = "miss"
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+    if entry.matches(request.headers.get("if-none-match")):
+        CACHE_REQUESTS.inc(result="not_modified")
+        return Response(status_code=304, headers=headers)
+    CACHE_REQUESTS.inc(result=result)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def timed_query(name, fn, *args):
+    with DB_QUERY_SECONDS.time(query=name):
+        result = fn(*args)
+    DB_ROWS.inc(len(result), query=name)
+    return result
 
-# Set DB path
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "crawler", "medicines.db")
+def table_columns(conn, table):
+    return [col[1] for col in conn.execute(f"PRAGMA table_info({table})")]
 
-# SQLite Connection
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def fetch_source_page(table, after, limit, fields):
+    conn = pool.reader()
+    selected = parse_fields(fields, table_columns(conn, table))
+    return fetch_page(conn, table, selected, after, limit)
 
 # Get raw table data
 @router.get("/pharmeasy")
-def get_pharmeasy_data():
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM pharmeasy").fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+def get_pharmeasy_data(
+    request: Request,
+    after: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = Query(None),
+):
+    return cached_page(request, ("pharmeasy", after, limit, fields),
+                       lambda: fetch_source_page("pharmeasy", after, limit, fields))
 
 @router.get("/apollo")
-def get_apollo_data():
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM apollo").fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
-
-# Helpers to parse ₹price or %discount
-def parse_price(price_str):
-    if price_str:
-        try:
-            cleaned = str(price_str).strip().replace("₹", "").replace(",", "").replace("*", "")
-            return float(cleaned)
-        except Exception as e:
-            print(f" Could not parse price: {price_str} → {e}")
-            return None
-    return None
-
-def parse_discount(discount_str):
-    if discount_str:
-        try:
-            cleaned = str(discount_str).lower().replace("off", "").replace("%", "").replace(" ", "")
-            return float(cleaned)
-        except Exception as e:
-            print(f" Could not parse discount: {discount_str} → {e}")
-            return None
-    return 0.0
+def get_apollo_data(
+    request: Request,
+    after: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = Query(None),
+):
+    return cached_page(request, ("apollo", after, limit, fields),
+                       lambda: fetch_source_page("apollo", after, limit, fields))
+
+# Columns exposed by the combined view
+COMBINED_FIELDS = ["name", "brand", "source", "price", "discount", "best_price", "best_offer"]
+
+# Sort key expression and direction, each backed by an expression index on combined_data.
+# Missing prices sort last, missing discounts count as 0%.
+SORT_KEYS = {
+    "price": ("COALESCE(price_value, 9e999)", False),
+    "discount": ("COALESCE(discount_pct, 0.0)", True),
+}
 
 # Shared logic to return combined table
-def fetch_combined_data_sorted(filter_by="price"):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM combined_data")
-    rows = cursor.fetchall()
-    conn.close()
-
-    result = []
-    for row in rows:
-        result.append({
-            "name": row["name"],
-            "brand": row["brand"],
-            "source": row["source"],
-            "price": row["price"],
-            "discount": row["discount"],
-            "best_price": row["best_price"],
-            "best_offer": row["best_offer"]
-        })
-
-    if filter_by == "price":
-        result = sorted(result, key=lambda x: parse_price(x["price"]) if x["price"] else float("inf"))
-    elif filter_by == "discount":
-        result = sorted(result, key=lambda x: parse_discount(x["discount"]) or 0.0, reverse=True)
+def fetch_combined_data_sorted(filter_by="price", after=None, limit=DEFAULT_PAGE_SIZE, fields=None):
+    selected = parse_fields(fields, COMBINED_FIELDS)
+    sort_key, descending = SORT_KEYS.get(filter_by, SORT_KEYS["price"])
+
+    return fetch_page(pool.reader(), "combined_data", selected, after, limit, sort_key, descending)
+
+# Streaming export of the combined table
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def encode_export_batch(rows, fields, fmt, first):
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if first:
+            writer.writerow(fields)
+        writer.writerows(rows)
+        return buf.getvalue()
+
+    lines = [json.dumps(dict(zip(fields, row)), ensure_ascii=False) for row in rows]
+    if fmt == "ndjson":
+        return "".join(line + "\n" for line in lines)
+    return ("[" if first else ",") + ",".join(lines)
+
+def stream_combined_data(filter_by, fields, fmt):
+    sort_key, descending = SORT_KEYS[filter_by]
+    # Own connection: the generator is resumed on different threadpool threads
+    conn = connect(check_same_thread=False)
+    try:
+        cursor = conn.execute(f"""
+            SELECT {", ".join(fields)}
+            FROM combined_data
+            ORDER BY {sort_key} {"DESC" if descending else "ASC"}, rowid
+        """)
+        first = True
+        while True:
+            with DB_QUERY_SECONDS.time(query="export"):
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            DB_ROWS.inc(len(rows), query="export")
+            yield encode_export_batch(rows, fields, fmt, first).encode("utf-8")
+            first = False
+
+        if fmt == "json":
+            yield b"[]" if first else b"]"
+        elif fmt == "csv" and first:
+            yield encode_export_batch([], fields, fmt, True).encode("utf-8")
+    finally:
+        conn.close()
 
-    return result
-@router.post("/api/reset-entry")
+@router.get("/combined/export")
+def export_combined_data(
+    format: str = Query("ndjson", enum=list(EXPORT_MEDIA_TYPES)),
+    filter_by: str = Query("price", enum=["price", "discount"]),
+    fields: str = Query(None),
+):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if filter_by not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unsupported filter: {filter_by}")
+    selected = parse_fields(fields, COMBINED_FIELDS)
+    return StreamingResponse(
+        stream_combined_data(filter_by, selected, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="combined_data.{format}"'},
+    )
+
+# Full-text / fuzzy medicine search across both sources
+@router.get("/search")
+def search_medicines(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+):
+    return timed_query("search", search, pool.reader(), q, limit)
+
+# Same medicine across sources (see matching.py), biggest price gap first
+@router.get("/matches")
+def get_matched_products(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    min_confidence: float = Query(MATCH_THRESHOLD, ge=0.0, le=1.0),
+):
+    def build():
+        return timed_query("matches", fetch_matched_products, pool.reader(), limit, min_confidence), None
+
+    return cached_page(request, ("matches", limit, min_confidence), build)
+
+# Downsampled price/discount series for charts; `since`/`until` are unix seconds
+@router.get("/history")
+def get_price_history(
+    name: str = Query(..., min_length=1),
+    source: str = Query(None),
+    since: int = Query(None, ge=0),
+    until: int = Query(None, ge=0),
+    points: int = Query(DEFAULT_POINTS, ge=1, le=MAX_PAGE_SIZE),
+):
+    if since is not None and until is not None and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    return timed_query("history", fetch_history, pool.reader(), name, source, since, until, points)
+
+# Catalog-wide price/discount statistics (see stats.py)
+@router.get("/stats")
+def get_stats(
+    request: Request,
+    top: int = Query(DEFAULT_TOP, ge=0, le=MAX_PAGE_SIZE),
+    brands: int = Query(DEFAULT_BRANDS, ge=0, le=MAX_PAGE_SIZE),
+    min_brand_rows: int = Query(MIN_BRAND_ROWS, ge=1),
+):
+    def build():
+        with DB_QUERY_SECONDS.time(query="stats"):
+            return catalog_stats(pool.reader(), top, brands, min_brand_rows), None
+
+    # A published snapshot can change without the database's data_version
+    _, version = stats_source(pool.reader())
+    return cached_page(request, ("stats", version, top, brands, min_brand_rows), build)
+
+# Per-city stock (see availability.py). With `name`: where that product is in
+# and out of stock. With one or more `city`: products out of stock in all of
+# them (`match=any`: in any), paged by rowid. Neither: the city dictionary with
+# per-city counts.
+@router.get("/availability")
+def get_availability(
+    request: Request,
+    name: str = Query(None, min_length=1),
+    city: list[str] = Query(None),
+    match: str = Query("all", enum=["all", "any"]),
+    source: str = Query(None),
+    after: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    if name and city:
+        raise HTTPException(status_code=400, detail="Pass either name or city, not both")
+    if name:
+        return timed_query("availability", product_availability, pool.reader(), name, source)
+
+    def build():
+        with DB_QUERY_SECONDS.time(query="availability"):
+            if not city:
+                return city_summary(pool.reader()), None
+            try:
+                return unavailable_in(pool.reader(), city, match == "all", source,
+                                      parse_cursor(after)[1] if after else None, limit)
+            except KeyError as e:
+                raise HTTPException(status_code=400, detail=f"Unknown city: {e.args[0]}")
+
+    return cached_page(request, ("availability", tuple(city or ()), match, source, after, limit), build)
+
+# Writer-thread jobs for the async endpoints below (see ConnectionPool.write)
+def clear_best_price(conn, name, brand):
+    with DB_QUERY_SECONDS.time(query="reset_entry"):
+        conn.execute("""
+            UPDATE combined_data
+            SET best_price = NULL, best_offer = NULL
+            WHERE name = ? AND brand = ?
+        """, (name, brand))
+        bump_data_version(conn)
+
+def save_best_prices(conn, body):
+    with DB_QUERY_SECONDS.time(query="bulk_update"):
+        if apply_updates(conn, body):
+            bump_data_version(conn)
+
+@router.post("/reset-entry")
 async def reset_entry(request: Request):
     try:
         data = request.json() if isinstance(request, dict) else await request.json()
@@ -89,150 +319,49 @@ async def reset_entry(request: Request):
         if not name or not brand:
             return JSONResponse(content={"error": "Missing name or brand"}, status_code=400)
 
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            UPDATE combined_data
-            SET best_price = NULL, best_offer = NULL
-            WHERE name = ? AND brand = ?
-        """, (name, brand))
+        await pool.write(clear_best_price, name, brand)
 
-        conn.commit()
         return JSONResponse(content={"status": "success"})
 
     except Exception as e:
+        log.exception("reset-entry failed")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-    finally:
-        if conn:
-            conn.close()
-
 @router.get("/create_and_update")
-def get_combined_data(filter_by: str = Query("price", enum=["price", "discount"])):
-    result = fetch_combined_data_sorted(filter_by)
-    return JSONResponse(content=result)
+def get_combined_data(
+    request: Request,
+    filter_by: str = Query("price", enum=["price", "discount"]),
+    after: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = Query(None),
+):
+    return cached_page(request, ("combined", filter_by, after, limit, fields),
+                       lambda: fetch_combined_data_sorted(filter_by, after, limit, fields))
 
 # Combined view/update endpoint
 @router.post("/create_and_update")
-async def create_and_update(request: Request, filter_by: str = Query("price", enum=["price", "discount"])):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS combined_data (
-        name TEXT,
-        brand TEXT,
-        price REAL,
-        discount REAL,
-        source TEXT,
-        best_price REAL,
-        best_offer REAL
-    );
-    """)
-
-    # Insert if empty
-    cursor.execute("SELECT COUNT(*) FROM combined_data")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("""
-        INSERT INTO combined_data (name, brand, price, discount, source, best_price, best_offer)
-        SELECT name, brand, price, discount, 'Pharmeasy', NULL, NULL FROM pharmeasy
-        UNION ALL
-        SELECT name, brand, price, discount, 'Apollo', NULL, NULL FROM apollo;
-        """)
-
-
+async def create_and_update(
+    request: Request,
+    filter_by: str = Query("price", enum=["price", "discount"]),
+    after: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = Query(None),
+):
     try:
         body = {}
         if request.headers.get("content-length") and int(request.headers.get("content-length")) > 0:
             body = await request.json()
 
-        def update_entry(name, brand, best_price, best_offer, force_clear=False):
-            cursor.execute("SELECT price, discount FROM combined_data WHERE name=? AND brand=?", (name, brand))
-            row = cursor.fetchone()
-            if not row:
-                print(f" No entry found for {name} ({brand})")
-                return
-
-            price = parse_price(row["price"])
-            discount = parse_discount(row["discount"])
-            mrp = None
-
-            if price is None:
-                print(f"❌ Skipping row for name={name}, brand={brand} due to bad price → price: {row['price']}")
-                return
-
-            if discount is None:
-                print(f" Discount unparseable for {name} ({brand}) → '{row['discount']}', proceeding with only best_price")
-                mrp = None
-            else:
-                if discount < 100:
-                    try:
-                        mrp = price / (1 - (discount / 100))
-                    except Exception as e:
-                        print(f" Error computing MRP for {name}: {e}")
-                        mrp = None
-            #  Clean and convert inputs
-            def clean(value):
-                if value in ("", None):
-                    return None
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return None
-
-            best_price = clean(best_price)
-            best_offer = clean(best_offer)
-
-            # Derive missing fields
-            if not force_clear and mrp and (not "cb" in row["discount"].lower()):
-                if best_price is not None and best_offer is None:
-                    best_offer = round((1 - best_price / mrp) * 100, 2)
-                elif best_offer is not None and best_price is None:
-                    best_price = round(mrp * (1 - best_offer / 100), 2)
-
-            print(f" name: {name}, brand: {brand}, price: {price}, discount: {discount}, best_price: {best_price}, best_offer: {best_offer}")
-
-            print(f" Cleaned → best_price: {best_price} ({type(best_price)}), best_offer: {best_offer} ({type(best_offer)})")
-
-            cursor.execute("""
-                UPDATE combined_data
-                SET best_price = ?, best_offer = ?
-                WHERE name = ? AND brand = ?
-            """, (None if best_price is None else best_price,None if  best_offer is None else best_offer, name, brand))
-
-        #  Single update
-        if isinstance(body, dict) and body.get("name") and body.get("brand"):
-            update_entry(
-                name=body.get("name"),
-                brand=body.get("brand"),
-                best_price=body.get("best_price"),
-                best_offer=body.get("best_offer"),
-                force_clear=body.get('force_clear', False)
-                )
-
-        #  Bulk updates
-        elif isinstance(body, list):
-            for entry in body:
-                if entry.get("name") and entry.get("brand"):
-                    update_entry(
-                        name=entry.get("name"),
-                        brand=entry.get("brand"),
-                        best_price=entry.get("best_price"),
-                        best_offer=entry.get("best_offer"),
-                        force_clear=entry.get('force_clear', False)
-                    )
-
-        conn.commit()
-        result = fetch_combined_data_sorted(filter_by)
-        return JSONResponse(content=result)
+        #  Single entry or bulk list, applied in one batch
+        await pool.write(save_best_prices, body)
+
+        page = await run_in_threadpool(fetch_combined_data_sorted, filter_by, after, limit, fields)
+        return page_response(*page)
+
+    except HTTPException:
+        raise
 
     except Exception as e:
-        print("Exception occurred:", e)
-        traceback.print_exc()
+        log.exception("create_and_update failed")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-    finally:
-        conn.close()
-
@@ -0,0 +1,119 @@
+import re
+
+# Two FTS5 indexes over combined_data (external content, kept in sync by triggers):
+#   search_words     word tokens with prefix indexes, for "dolo 65" style queries
+#   search_trigrams  character trigrams, for typo-tolerant fallback ("paracetmol")
+INDEXES = {
+    "search_words": "tokenize='unicode61 remove_diacritics 2', prefix='2 3'",
+    "search_trigrams": "tokenize='trigram'",
+}
+INDEXED_COLUMNS = ("name", "brand", "packaging")
+
+FUZZY_CANDIDATES = 200      # trigram hits re-scored in Python
+FUZZY_THRESHOLD = 0.5       # minimum average Dice similarity per query word
+
+TOKEN = re.compile(r"[0-9a-z]+")
+
+def ensure_search_index(cursor):
+    columns = ", ".join(INDEXED_COLUMNS)
+    new_values = ", ".join(f"NEW.{c}" for c in INDEXED_COLUMNS)
+    old_values = ", ".join(f"OLD.{c}" for c in INDEXED_COLUMNS)
+
+    for index, options in INDEXES.items():
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (index,)
+        ).fetchone()
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {columns}, content='combined_data', content_rowid='rowid', {options}
+            )
+        """)
+        if not exists:
+            cursor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON combined_data BEGIN
+                INSERT INTO {index}(rowid, {columns}) VALUES (NEW.rowid, {new_values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON combined_data BEGIN
+                INSERT INTO {index}({index}, rowid, {columns}) VALUES ('delete', OLD.rowid, {old_values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {columns} ON combined_data BEGIN
+                INSERT INTO {index}({index}, rowid, {columns}) VALUES ('delete', OLD.rowid, {old_values});
+                INSERT INTO {index}(rowid, {columns}) VALUES (NEW.rowid, {new_values});
+            END
+        """)
+
+def tokens(text):
+    return TOKEN.findall((text or "").lower())
+
+def trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)} or {word}
+
+def similarity(query_words, text):
+    """Average over query words of the best Dice trigram overlap with any word of `text`."""
+    candidates = [trigrams(w) for w in tokens(text)]
+    if not candidates:
+        return 0.0
+    total = 0.0
+    for word in query_words:
+        q = trigrams(word)
+        total += max(2 * len(q & c) / (len(q) + len(c)) for c in candidates)
+    return total / len(query_words)
+
+RESULT_COLUMNS = "c.rowid, c.name, c.brand, c.packaging, c.source, c.price, c.discount, c.best_price, c.best_offer, c.price_value"
+
+def row_to_result(row):
+    return {k: row[k] for k in ("name", "brand", "packaging", "source", "price", "discount", "best_price", "best_offer")}
+
+def search(conn, q, limit=20):
+    """Prefix matches first, then typo-tolerant matches; cheapest first within each group."""
+    words = tokens(q)
+    if not words:
+        return []
+
+    # Every word must match as a word prefix in name, brand or packaging
+    prefix_query = " AND ".join(f'"{w}"*' for w in words)
+    exact = conn.execute(f"""
+        SELECT {RESULT_COLUMNS}
+        FROM search_words s JOIN combined_data c ON c.rowid = s.rowid
+        WHERE search_words MATCH ?
+        ORDER BY COALESCE(c.price_value, 9e999)
+        LIMIT ?
+    """, (prefix_query, limit)).fetchall()
+
+    results = [row_to_result(row) for row in exact]
+    if len(results) >= limit:
+        return results
+
+    # Typo-tolerant fallback: any shared trigram makes a candidate, then re-score
+    grams = sorted({g for w in words if len(w) >= 3 for g in trigrams(w)})
+    if not grams:
+        return results
+    trigram_query = " OR ".join(f'"{g}"' for g in grams)
+    candidates = conn.execute(f"""
+        SELECT {RESULT_COLUMNS}
+        FROM search_trigrams s JOIN combined_data c ON c.rowid = s.rowid
+        WHERE search_trigrams MATCH ?
+        ORDER BY s.rank
+        LIMIT ?
+    """, (trigram_query, FUZZY_CANDIDATES)).fetchall()
+
+    seen = {row["rowid"] for row in exact}
+    scored = []
+    for row in candidates:
+        if row["rowid"] in seen:
+            continue
+        text = " ".join(filter(None, (row["name"], row["brand"], row["packaging"])))
+        score = similarity(words, text)
+        if score >= FUZZY_THRESHOLD:
+            price = row["price_value"] if row["price_value"] is not None else float("inf")
+            scored.append((-round(score, 1), price, row))
+
+    scored.sort(key=lambda item: item[:2])
+    results += [row_to_result(row) for _, _, row in scored[:limit - len(results)]]
+    return results
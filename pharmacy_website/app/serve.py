@@ -0,0 +1,67 @@
+import argparse
+import os
+
+from gunicorn.app.base import BaseApplication
+
+# ======================
+# Production Server
+# ======================
+# gunicorn master + uvicorn worker processes, each with its own event loop,
+# threadpool and SQLite connection pool. The app is preloaded: the master
+# imports it, runs the startup DDL/sync and maps the catalog snapshot once,
+# then forks, so workers start serving immediately and share those pages.
+#
+# Shared state across workers:
+#   - SQLite: one writer at a time (BEGIN IMMEDIATE, see database.py), readers
+#     unlimited under WAL. No connection is open across the fork.
+#   - Response cache and stats frames: per worker, keyed by data_version /
+#     snapshot version, so a write in one worker invalidates all of them.
+#   - /metrics: per worker; a scrape sees whichever worker answered.
+#
+# Run from pharmacy_website/app:
+#     python serve.py [--workers N] [--bind 0.0.0.0:8000]
+# Development (single process, reload): uvicorn main:app --reload
+
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+BIND = os.environ.get("BIND", "0.0.0.0:8000")
+
+class Server(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from database import pool
+        from main import app, prepare
+        from snapshot import snapshots
+
+        prepare()
+        snapshots.current()
+        # Connections must not cross the fork; each worker opens its own
+        pool.close()
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with gunicorn and uvicorn workers.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker processes (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--bind", default=BIND, help="host:port to listen on")
+    parser.add_argument("--timeout", type=int, default=60, help="seconds before a silent worker is restarted")
+    parser.add_argument("--access-log", action="store_true", help="log every request to stdout")
+    args = parser.parse_args()
+
+    Server({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "graceful_timeout": 30,
+        "accesslog": "-" if args.access_log else None,
+    }).run()
+
+if __name__ == "__main__":
+    main()
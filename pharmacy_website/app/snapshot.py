@@ -0,0 +1,279 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from combined import backfill_numeric_columns
+from database import BASE_DIR, connect, data_version
+from logs import get_logger, setup_logging
+
+log = get_logger("snapshot")
+
+# ======================
+# Catalog Snapshot Format
+# ======================
+# Read-only copy of the normalized catalog (combined_data plus product
+# matches) in one file: fixed-width little-endian numeric columns and, for
+# every text column, int32 codes into a per-column string table (offsets +
+# UTF-8 blob). Blocks are 64-byte aligned, so readers np.frombuffer() them
+# straight out of an mmap: nothing is parsed or copied, and every worker on
+# the box shares the page-cache copy.
+#
+#   MAGIC | u32 header length | JSON header | padding | blocks
+#
+# The header holds the data_version the snapshot was taken at and
+# (dtype, offset, count) per block, offsets counted from the first block.
+#
+# Publishing writes catalog-<version>.snap under a temp name, fsyncs and
+# renames it, then swaps the CURRENT pointer file the same way, so readers
+# never see a partial file. Shipping to another box: copy the .snap, then
+# CURRENT.
+
+MAGIC = b"PHSNAP\x00\x01"
+FORMAT_VERSION = 1
+ALIGN = 64
+SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", os.path.join(BASE_DIR, "crawler", "snapshots"))
+POINTER = "CURRENT"
+KEEP = 3                # published versions left on disk
+CHECK_INTERVAL = 1.0    # seconds between CURRENT checks in API workers
+
+# NULL is NaN for floats and -1 for integers and text codes
+NUMERIC_COLUMNS = {
+    "rowid": "<i8",
+    "price_value": "<f8",
+    "discount_pct": "<f8",
+    "mrp_value": "<f8",
+    "is_cashback": "<i1",
+    "changed_at": "<i8",
+    "product_id": "<i8",        # product_matches group; -1 when unmatched
+    "match_confidence": "<f8",
+}
+TEXT_COLUMNS = ["name", "brand", "source", "packaging", "price", "discount"]
+
+SNAPSHOT_SQL = """
+    SELECT c.rowid, c.price_value, c.discount_pct, c.mrp_value, c.is_cashback, c.changed_at,
+           m.product_id, m.confidence, c.name, c.brand, c.source, c.packaging, c.price, c.discount
+    FROM combined_data c LEFT JOIN product_matches m ON m.item_rowid = c.rowid
+    ORDER BY c.rowid
+"""
+
+# ======================
+# Writing
+# ======================
+def numeric_block(values, dtype):
+    if np.dtype(dtype).kind == "f":
+        return np.array(values, dtype=dtype)
+    return np.array([-1 if v is None else v for v in values], dtype=dtype)
+
+def text_blocks(values):
+    """(codes, offsets, blob) for one text column.
+
+    price and discount are REAL-affinity columns, so numeric-looking scraped
+    strings come back as numbers; they are stored as str() of the value.
+    """
+    index = {None: -1}
+    codes = np.array([index.setdefault(v, len(index) - 1) for v in values], dtype="<i4")
+    encoded = [(v if isinstance(v, str) else str(v)).encode("utf-8") for v in list(index)[1:]]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype="<u8")
+    return codes, offsets, np.frombuffer(b"".join(encoded), dtype="|u1")
+
+def build_blocks(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    rows = cursor.execute(SNAPSHOT_SQL).fetchall()
+    columns = list(zip(*rows)) if rows else [()] * (len(NUMERIC_COLUMNS) + len(TEXT_COLUMNS))
+
+    blocks = {}
+    for (name, dtype), values in zip(NUMERIC_COLUMNS.items(), columns):
+        blocks[name] = numeric_block(values, dtype)
+    for name, values in zip(TEXT_COLUMNS, columns[len(NUMERIC_COLUMNS):]):
+        blocks[name], blocks[f"{name}.offsets"], blocks[f"{name}.blob"] = text_blocks(values)
+    return len(rows), blocks
+
+def padding(size):
+    return b"\0" * (-size % ALIGN)
+
+def write_snapshot(path, version, rows, blocks):
+    directory, offset = {}, 0
+    for name, array in blocks.items():
+        directory[name] = {"dtype": array.dtype.str, "offset": offset, "count": len(array)}
+        offset += array.nbytes + (-array.nbytes % ALIGN)
+    header = json.dumps({
+        "format": FORMAT_VERSION, "data_version": version, "rows": rows,
+        "created": int(time.time()), "text_columns": TEXT_COLUMNS, "blocks": directory,
+    }).encode("utf-8")
+
+    with open(path, "wb") as f:
+        preamble = MAGIC + struct.pack("<I", len(header)) + header
+        f.write(preamble + padding(len(preamble)))
+        for array in blocks.values():
+            f.write(array.tobytes())
+            f.write(padding(array.nbytes))
+        f.flush()
+        os.fsync(f.fileno())
+
+def replace_durably(tmp_path, path):
+    os.replace(tmp_path, path)
+    dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def snapshot_files(directory):
+    """Published snapshot file names, oldest version first."""
+    names = [n for n in os.listdir(directory) if n.startswith("catalog-") and n.endswith(".snap")]
+    return sorted(names, key=lambda n: int(n[len("catalog-"):-len(".snap")]))
+
+def publish_snapshot(conn, directory=SNAPSHOT_DIR):
+    """Write the catalog at its current data_version and point CURRENT at it. Returns the path."""
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    # The crawler sink normalizes rows as it writes them; catch any written
+    # around it (e.g. a recreated source table) so none is published as NaN
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        backfill_numeric_columns(conn.cursor())
+    # One read transaction: the blocks and the version come from the same state
+    with conn:
+        conn.execute("BEGIN")
+        version = data_version(conn)
+        rows, blocks = build_blocks(conn)
+
+    name = f"catalog-{version}.snap"
+    path = os.path.join(directory, name)
+    write_snapshot(path + ".tmp", version, rows, blocks)
+    replace_durably(path + ".tmp", path)
+
+    pointer = os.path.join(directory, POINTER)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    replace_durably(pointer + ".tmp", pointer)
+
+    # Workers still mapping an unlinked file keep reading it until they swap
+    for old in snapshot_files(directory)[:-KEEP]:
+        if old != name:
+            os.remove(os.path.join(directory, old))
+    log.info("Published %s: %d rows, %.1f MB in %.2fs",
+             name, rows, os.path.getsize(path) / 1e6, time.perf_counter() - started)
+    return path
+
+# ======================
+# Reading
+# ======================
+class Snapshot:
+    """One mapped snapshot file. Columns are read-only NumPy views into the mapping."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a catalog snapshot")
+        (length,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._map[start:start + length])
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: snapshot format {header['format']}, expected {FORMAT_VERSION}")
+
+        self.version = header["data_version"]
+        self.rows = header["rows"]
+        self.created = header["created"]
+        self._base = start + length + (-(start + length) % ALIGN)
+        self._blocks = header["blocks"]
+        self._labels = {}
+
+    def column(self, name):
+        block = self._blocks[name]
+        return np.frombuffer(self._map, dtype=block["dtype"], count=block["count"],
+                             offset=self._base + block["offset"])
+
+    def labels(self, name):
+        """Every distinct value of a text column, indexed by code (decoded once, then cached)."""
+        labels = self._labels.get(name)
+        if labels is None:
+            offsets = self.column(f"{name}.offsets")
+            blob = self.column(f"{name}.blob").tobytes()
+            labels = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+            self._labels[name] = labels
+        return labels
+
+    def text(self, name, rows):
+        """Values of a text column for the given row indexes, decoding only those strings."""
+        codes = self.column(name)[rows]
+        offsets = self.column(f"{name}.offsets")
+        blob = self.column(f"{name}.blob")
+        return [
+            None if code < 0 else blob[offsets[code]:offsets[code + 1]].tobytes().decode("utf-8")
+            for code in codes
+        ]
+
+class SnapshotStore:
+    """The snapshot CURRENT points at, re-checked at most every CHECK_INTERVAL seconds.
+
+    A new version is mapped on the next check and replaces the old one for
+    new callers; the old mapping goes away with the last array that uses it.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        self._snapshot = None
+        self._name = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self):
+        if time.monotonic() - self._checked >= CHECK_INTERVAL:
+            with self._lock:
+                if time.monotonic() - self._checked >= CHECK_INTERVAL:
+                    self._swap()
+                    self._checked = time.monotonic()
+        return self._snapshot
+
+    def _swap(self):
+        try:
+            with open(os.path.join(self.directory, POINTER)) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            name = None
+        if name == self._name:
+            return
+        try:
+            self._snapshot = Snapshot(os.path.join(self.directory, name)) if name else None
+        except (OSError, ValueError) as e:
+            log.warning("Keeping snapshot %s, cannot map %s: %s", self._name, name, e)
+            return
+        self._name = name
+        if self._snapshot:
+            log.info("Mapped %s (%d rows)", name, self._snapshot.rows)
+
+snapshots = SnapshotStore()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish or inspect catalog snapshots.")
+    parser.add_argument("--db", help="database to snapshot (default: MEDICINES_DB / crawler/medicines.db)")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="snapshot directory")
+    parser.add_argument("--info", action="store_true", help="describe the current snapshot instead")
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.info:
+        snapshot = SnapshotStore(args.dir).current()
+        if snapshot is None:
+            raise SystemExit(f"No snapshot published in {args.dir}")
+        print(f"{snapshot.path}: data_version {snapshot.version}, {snapshot.rows} rows, "
+              f"created {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.created))}")
+    else:
+        conn = connect(args.db)
+        try:
+            publish_snapshot(conn, args.dir)
+        finally:
+            conn.close()
@@ -0,0 +1,277 @@
+import threading
+import time
+
+import numpy as np
+
+from database import data_version
+from logs import get_logger
+from matching import MATCH_THRESHOLD
+from snapshot import snapshots
+
+log = get_logger("stats")
+
+# Catalog-wide price and discount statistics over NumPy columns. When a
+# catalog snapshot is published (snapshot.py) the columns are its mapped
+# arrays and follow its version; otherwise combined_data is read into arrays
+# once per data_version. Everything that does not depend on request
+# parameters is computed at load, so a request only slices the brand table
+# and picks the top deals.
+
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+GAP_BINS = [0, 5, 10, 20, 30, 50, 75, 100, np.inf]     # relative price gap between sources, %
+DEFAULT_TOP = 10
+DEFAULT_BRANDS = 50
+MIN_BRAND_ROWS = 3
+
+def number(value, digits=2):
+    """JSON-safe float: NaN becomes None."""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+def percentiles(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {f"p{p}": None for p in PERCENTILES}
+    return {f"p{p}": number(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def codes_for(labels):
+    """Dense integer codes for a column of labels -> (codes, distinct labels); None gets -1."""
+    index = {None: -1}
+    codes = np.array([index.setdefault(label, len(index) - 1) for label in labels], dtype=np.int64)
+    return codes, list(index)[1:]
+
+def columns(conn, sql, params=(), count=0):
+    """Result columns as tuples (plain tuples, not sqlite3.Row: ~30% faster at 1M rows)."""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    rows = cursor.execute(sql, params).fetchall()
+    return list(zip(*rows)) if rows else [()] * count
+
+def group_medians(codes, values, groups):
+    """(non-NaN counts, medians) of `values` per code in range(groups), from one sort."""
+    keep = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(groups, np.nan)
+    present = counts > 0
+    lo = starts[present] + (counts[present] - 1) // 2
+    hi = starts[present] + counts[present] // 2
+    medians[present] = (values[lo] + values[hi]) / 2
+    return counts, medians
+
+class PriceFrame:
+    """Catalog price columns and matched-product groups, plus the statistics derived from them.
+
+    `source` and `brand` are integer codes into the `sources` and `brands`
+    labels, `product` the matched product per row (-1: unmatched); NULLs are
+    NaN in the float columns and -1 in the codes.
+    """
+
+    def __init__(self, version, rowid, price, discount, mrp, cashback, source, sources, brand, brands,
+                 product, snapshot=None):
+        started = time.perf_counter()
+        self.version = version
+        self.rowid = rowid
+        self.price = price
+        self.discount = discount    # NULL for cashback offers
+        self.mrp = mrp
+        self.cashback = cashback
+        self.source, self.sources = source, sources
+        self.brand, self.brands = brand, brands
+        self.product = product
+        self.snapshot = snapshot
+
+        self.source_stats = self.summarize_sources()
+        self.brand_counts, self.brand_price = group_medians(self.brand, self.price, len(self.brands))
+        _, self.brand_discount = group_medians(self.brand, self.discount, len(self.brands))
+        self.price_gaps = self.summarize_gaps()
+        self.deals = self.rank_deals()
+        log.info("Computed stats over %d rows in %.2fs", len(self.rowid), time.perf_counter() - started)
+
+    def summarize_sources(self):
+        groups = len(self.sources)
+        counts = np.bincount(self.source, minlength=groups)
+        priced, median_price = group_medians(self.source, self.price, groups)
+        _, median_discount = group_medians(self.source, self.discount, groups)
+        cashback = np.bincount(self.source[self.cashback], minlength=groups)
+        return [
+            {
+                "source": label,
+                "rows": int(counts[i]),
+                "priced": int(priced[i]),
+                "cashback_offers": int(cashback[i]),
+                "median_price": number(median_price[i]),
+                "median_discount": number(median_discount[i]),
+                "price_percentiles": percentiles(self.price[self.source == i]),
+                "discount_percentiles": percentiles(self.discount[self.source == i]),
+            }
+            for i, label in enumerate(self.sources)
+        ]
+
+    def summarize_gaps(self):
+        """Max - min price within each product matched across sources (see matching.py)."""
+        at = np.flatnonzero((self.product >= 0) & ~np.isnan(self.price))
+        product = self.product[at]
+
+        # Sorted by (product, price): the first row of a group is the cheapest
+        order = np.lexsort((self.price[at], product))
+        at, product = at[order], product[order]
+        price, source = self.price[at], self.source[at]
+        starts = np.flatnonzero(np.diff(product, prepend=-1))
+        sizes = np.diff(np.append(starts, len(product)))
+        starts, sizes = starts[sizes > 1], sizes[sizes > 1]
+        low, high = price[starts], price[starts + sizes - 1]
+        gap = high - low
+        pct = np.divide(gap * 100, low, out=np.full(len(gap), np.nan), where=low > 0)
+
+        cheapest = source[starts]
+        cheaper = np.bincount(cheapest[(gap > 0) & (cheapest >= 0)], minlength=len(self.sources))
+        histogram, _ = np.histogram(pct[~np.isnan(pct)], bins=GAP_BINS)
+        return {
+            "products": len(gap),
+            "same_price": int((gap == 0).sum()),
+            "cheapest_source": {label: int(cheaper[i]) for i, label in enumerate(self.sources)},
+            "gap_percentiles": percentiles(gap),
+            "gap_pct_percentiles": percentiles(pct),
+            "gap_pct_histogram": [
+                {"from_pct": GAP_BINS[i], "to_pct": None if np.isinf(GAP_BINS[i + 1]) else GAP_BINS[i + 1],
+                 "products": int(n)}
+                for i, n in enumerate(histogram)
+            ],
+        }
+
+    def brand_table(self, limit, min_rows):
+        """Brands with at least `min_rows` priced rows, most rows first."""
+        eligible = np.flatnonzero(self.brand_counts >= min_rows)
+        order = eligible[np.lexsort((eligible, -self.brand_counts[eligible]))][:limit]
+        return [
+            {
+                "brand": self.brands[i],
+                "rows": int(self.brand_counts[i]),
+                "median_price": number(self.brand_price[i]),
+                "median_discount": number(self.brand_discount[i]),
+            }
+            for i in order
+        ]
+
+    def rank_deals(self):
+        """Priced rows by discount, largest saving against MRP breaking ties."""
+        candidates = np.flatnonzero(~np.isnan(self.discount) & ~np.isnan(self.price))
+        saving = np.nan_to_num(self.mrp[candidates] - self.price[candidates])
+        return candidates[np.lexsort((-saving, -self.discount[candidates]))]
+
+    def best_deals(self, conn, top):
+        picked = self.deals[:top]
+        if not len(picked):
+            return []
+        if self.snapshot is not None:
+            names = self.snapshot.text("name", picked)
+            brands = self.snapshot.text("brand", picked)
+            return [self.deal(i, name, brand) for i, name, brand in zip(picked, names, brands)]
+
+        rowids = [int(r) for r in self.rowid[picked]]
+        names = {
+            row["rowid"]: row for row in conn.execute(
+                f"SELECT rowid, name, brand FROM combined_data WHERE rowid IN ({','.join('?' * len(rowids))})",
+                rowids,
+            )
+        }
+        deals = []
+        for i, rowid in zip(picked, rowids):
+            row = names.get(rowid)
+            if row is None:
+                continue    # deleted since the frame was loaded
+            deals.append(self.deal(i, row["name"], row["brand"]))
+        return deals
+
+    def deal(self, i, name, brand):
+        return {
+            "name": name,
+            "brand": brand,
+            "source": self.sources[self.source[i]],
+            "price_value": number(self.price[i]),
+            "mrp_value": number(self.mrp[i]),
+            "discount_pct": number(self.discount[i]),
+        }
+
+def load_database_frame(conn, version):
+    started = time.perf_counter()
+    rowids, sources, brands, prices, discounts, mrps, cashback = columns(
+        conn, "SELECT rowid, source, brand, price_value, discount_pct, mrp_value, is_cashback "
+        "FROM combined_data ORDER BY rowid",     # sorted rowids: matches are looked up below
+        count=7,
+    )
+    rowid = np.array(rowids, dtype=np.int64)
+    source, source_labels = codes_for(sources)
+    brand, brand_labels = codes_for(brands)
+
+    items, products = columns(
+        conn, "SELECT item_rowid, product_id FROM product_matches WHERE confidence >= ?",
+        (MATCH_THRESHOLD,), count=2,
+    )
+    items = np.array(items, dtype=np.int64)
+    at = np.searchsorted(rowid, items)
+    found = at < len(rowid)
+    found[found] = rowid[at[found]] == items[found]
+    product = np.full(len(rowid), -1, dtype=np.int64)
+    product[at[found]] = np.array(products, dtype=np.int64)[found]
+    log.info("Read %d rows from the database in %.2fs", len(rowid), time.perf_counter() - started)
+
+    return PriceFrame(
+        version, rowid,
+        np.array(prices, dtype=np.float64),         # None -> NaN
+        np.array(discounts, dtype=np.float64),
+        np.array(mrps, dtype=np.float64),
+        np.array(cashback, dtype=np.float64) == 1,
+        source, source_labels, brand, brand_labels, product,
+    )
+
+def load_snapshot_frame(snapshot, version):
+    """Zero-copy: the numeric and code columns stay views into the mapped file."""
+    matched = snapshot.column("match_confidence") >= MATCH_THRESHOLD     # NaN (unmatched) is False
+    return PriceFrame(
+        version, snapshot.column("rowid"),
+        snapshot.column("price_value"), snapshot.column("discount_pct"), snapshot.column("mrp_value"),
+        snapshot.column("is_cashback") == 1,
+        snapshot.column("source"), snapshot.labels("source"),
+        snapshot.column("brand"), snapshot.labels("brand"),
+        np.where(matched, snapshot.column("product_id"), -1),
+        snapshot=snapshot,
+    )
+
+_frame = None
+_frame_lock = threading.Lock()
+
+def stats_source(conn):
+    """(snapshot or None, version): what the statistics are currently computed from."""
+    snapshot = snapshots.current()
+    return snapshot, (("snapshot", snapshot.version) if snapshot else ("database", data_version(conn)))
+
+def price_frame(conn):
+    """The PriceFrame for the current snapshot or data version, rebuilt when that changes."""
+    global _frame
+    snapshot, version = stats_source(conn)
+    frame = _frame
+    if frame is None or frame.version != version:
+        with _frame_lock:
+            if _frame is None or _frame.version != version:
+                if snapshot:
+                    _frame = load_snapshot_frame(snapshot, version)
+                else:
+                    _frame = load_database_frame(conn, version)
+            frame = _frame
+    return frame
+
+def catalog_stats(conn, top=DEFAULT_TOP, brands=DEFAULT_BRANDS, min_brand_rows=MIN_BRAND_ROWS):
+    frame = price_frame(conn)
+    return {
+        "rows": len(frame.rowid),
+        "sources": frame.source_stats,
+        "price_gaps": frame.price_gaps,
+        "brands": frame.brand_table(brands, min_brand_rows),
+        "best_deals": frame.best_deals(conn, top),
+    }
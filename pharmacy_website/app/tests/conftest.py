@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules import each other by bare name, as when run from pharmacy_website/app
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(APP_DIR, "crawler"))
@@ -0,0 +1,169 @@
+"""crawler/http_fetch.py against a local http.server serving bench/fixtures.
+
+Run from pharmacy_website/app (pip install -r requirements-dev.txt):
+    python -m pytest -q
+"""
+import json
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from adapters import ADAPTERS
+from extract import Extractor
+from http_fetch import fetch_html, json_ld_availability, json_ld_fields, json_ld_product
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "fixtures")
+
+# ======================
+# Local Server
+# ======================
+# Paths outside the fixtures: (status, Content-Type, body)
+ROUTES = {
+    "/error": (500, "text/html", "<p>Internal error</p>".encode()),
+    "/product.json": (200, "application/json", b'{"name": "Dolo 650"}'),
+    "/latin1": (200, "text/html; charset=iso-8859-1", "<p>Paracétamol</p>".encode("latin-1")),
+    "/rupee": (200, "text/html", "<p>₹30.91</p>".encode()),
+}
+
+class Handler(SimpleHTTPRequestHandler):
+    """Fixture files as text/html (no charset, like the real sites), plus ROUTES and /cookies."""
+
+    def do_GET(self):
+        if self.path == "/cookies":
+            self.respond(200, "text/html", (self.headers.get("Cookie") or "").encode())
+        elif self.path in ROUTES:
+            self.respond(*ROUTES[self.path])
+        else:
+            super().do_GET()
+
+    def respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=FIXTURES))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+# ======================
+# fetch_html
+# ======================
+def test_fetch_html_returns_fixture(base_url):
+    with open(f"{FIXTURES}/pharmeasy_dolo650.html", encoding="utf-8") as f:
+        assert fetch_html(f"{base_url}/pharmeasy_dolo650.html") == f.read()
+
+def test_fetch_html_defaults_to_utf8_without_charset(base_url):
+    assert fetch_html(f"{base_url}/rupee") == "<p>₹30.91</p>"
+
+def test_fetch_html_honours_declared_charset(base_url):
+    assert fetch_html(f"{base_url}/latin1") == "<p>Paracétamol</p>"
+
+@pytest.mark.parametrize("path", ["/missing.html", "/error", "/product.json"])
+def test_fetch_html_rejects_errors_and_non_html(base_url, path):
+    assert fetch_html(base_url + path) is None
+
+def test_fetch_html_connection_error():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port = server.server_address[1]
+    server.server_close()
+    assert fetch_html(f"http://127.0.0.1:{port}/") is None
+
+def test_fetch_html_sends_cookies(base_url):
+    assert fetch_html(f"{base_url}/cookies", cookies={"pincode": "400001"}) == "pincode=400001"
+
+# ======================
+# Parsed Records
+# ======================
+EXPECTED = {
+    "pharmeasy_dolo650.html": {
+        "name": "Dolo 650 Tablet 15's", "brand": "MICRO LABS LTD", "packaging": "Strip of 15 Tablets",
+        "price": "₹30.91", "mrp": "₹33.60", "discount": "8% OFF", "unit_price": None, "source": "pharmeasy",
+    },
+    # Name, brand and price only in JSON-LD (@graph, brand object)
+    "pharmeasy_jsonld.html": {
+        "name": "Crocin Advance 500mg Tablet 20'S", "brand": "GSK", "packaging": "Strip of 20 Tablets",
+        "price": "₹21.54", "mrp": None, "discount": "Get extra 10% off", "unit_price": "₹1.08/Tablet",
+        "source": "pharmeasy",
+    },
+    "apollo_calpol.html": {
+        "name": "Calpol 500mg Tablet 15's", "brand": "GlaxoSmithKline Pharmaceuticals Ltd", "packaging": None,
+        "price": "₹15.09", "mrp": None, "discount": "4% off", "unit_price": "₹1.01/Tablet", "source": "apollo",
+    },
+    # Client-rendered page: nothing until the browser fallback renders it
+    "apollo_shell.html": {
+        "name": None, "brand": None, "packaging": None, "price": None, "mrp": None, "discount": None,
+        "unit_price": None, "source": "apollo",
+    },
+}
+
+@pytest.mark.parametrize("filename", sorted(EXPECTED))
+def test_fetched_fixture_parses(base_url, filename):
+    site = filename.split("_", 1)[0]
+    html = fetch_html(f"{base_url}/{filename}")
+    assert Extractor(ADAPTERS[site])(html) == EXPECTED[filename]
+
+# ======================
+# JSON-LD
+# ======================
+def ld(*items):
+    return [json.dumps(item) for item in items]
+
+PRODUCT = {"@type": "Product", "name": "Dolo 650", "brand": "Micro Labs", "offers": {"price": "30.91"}}
+
+def test_json_ld_product_skips_other_types_and_bad_blocks():
+    blocks = [None, "", "{not json", *ld({"@type": "BreadcrumbList"}, PRODUCT)]
+    assert json_ld_product(blocks) == PRODUCT
+
+def test_json_ld_product_in_graph_and_top_level_list():
+    assert json_ld_product(ld({"@context": "https://schema.org", "@graph": [{"@type": "WebPage"}, PRODUCT]})) == PRODUCT
+    assert json_ld_product(ld([{"@type": "Organization"}, PRODUCT])) == PRODUCT
+    assert json_ld_product(ld({"@type": "WebPage"})) is None
+
+@pytest.mark.parametrize("block", ["42", "null", '"Product"', "true", '[1, "x", null, ["nested"]]', '{"@graph": "x"}'])
+def test_json_ld_product_skips_non_objects(block):
+    assert json_ld_product([block]) is None
+    assert json_ld_product([block, *ld(PRODUCT)]) == PRODUCT
+
+def test_json_ld_product_graph_object():
+    assert json_ld_product(ld({"@graph": PRODUCT})) == PRODUCT
+
+def test_json_ld_fields():
+    assert json_ld_fields(ld(PRODUCT)) == ("Dolo 650", "Micro Labs", "₹30.91")
+    assert json_ld_fields(ld({**PRODUCT, "brand": {"@type": "Brand", "name": "GSK"}}))[1] == "GSK"
+    assert json_ld_fields([]) == (None, None, None)
+
+@pytest.mark.parametrize("offers, price", [
+    ([{"price": 12.5}, {"price": 99}], "₹12.5"),    # first offer wins
+    ([], None),
+    ({"price": ""}, None),
+    ({}, None),
+    ("30.91", None),
+])
+def test_json_ld_fields_offers(offers, price):
+    assert json_ld_fields(ld({**PRODUCT, "offers": offers}))[2] == price
+
+@pytest.mark.parametrize("availability, in_stock", [
+    ("https://schema.org/InStock", True),
+    ("http://schema.org/OutOfStock/", False),
+    ("SoldOut", False),
+    ("https://schema.org/BackOrder", None),
+    (None, None),
+])
+def test_json_ld_availability(availability, in_stock):
+    offers = [{"price": "30.91", "availability": availability}]
+    assert json_ld_availability(ld({**PRODUCT, "offers": offers})) is in_stock